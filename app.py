@@ -1,9 +1,11 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
+import uuid
 
+from services.analysis_jobs import AnalysisJobManager
 from services.pipeline import FactCheckPipeline
-from config import STREAMLIT_TITLE, STREAMLIT_DESCRIPTION
+from config import STREAMLIT_TITLE, STREAMLIT_DESCRIPTION, ANALYSIS_POLL_INTERVAL
 from utils.logger import logger
 
 load_dotenv()
@@ -18,6 +20,10 @@ st.set_page_config(
 st.title(STREAMLIT_TITLE)
 st.markdown(STREAMLIT_DESCRIPTION)
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+
 @st.cache_resource
 def get_pipeline():
     try:
@@ -35,7 +41,17 @@ def get_pipeline():
         st.stop()
 
 
+@st.cache_resource
+def get_job_manager():
+    # One bounded pool for every session, so concurrent analyses queue instead of piling up
+    return AnalysisJobManager(get_pipeline())
+
+
 def display_verdict(verdict: str, confidence: float = None):
+    if verdict == "Not checked":
+        st.info(f"⏱️ **Verdict: {verdict}** (stopped before this claim was verified)")
+        return
+    
     if "true" in verdict.lower():
         st.success(f"✅ **Verdict: {verdict}**")
     elif "false" in verdict.lower():
@@ -47,6 +63,94 @@ def display_verdict(verdict: str, confidence: float = None):
         st.metric("Confidence Score", f"{confidence:.0%}")
 
 
+def display_text_result(i: int, claim: str, result: dict = None):
+    if result is None:
+        with st.expander(f"**Claim {i}** ⏳: {claim[:100]}...", expanded=False):
+            st.info(claim)
+            st.caption("Waiting to be verified...")
+        return
+    
+    claim_text = result.get('claim', '')[:100]
+    reused_marker = " ♻️" if result.get("reused") else ""
+    with st.expander(f"**Claim {i}**{reused_marker}: {claim_text}...", expanded=True):
+        st.markdown("**📝 Full Claim:**")
+        st.info(result.get("claim", ""))
+        
+        display_verdict(result.get("verdict", "Unverifiable"), result.get("confidence"))
+        
+        st.markdown("**🧠 Reasoning:**")
+        reasoning = result.get("reasoning", "No reasoning available")
+        st.markdown(reasoning)
+        
+        if show_evidence and result.get("evidence"):
+            st.markdown("**📚 Evidence:**")
+            evidence_list = result.get("evidence", [])
+            if isinstance(evidence_list, list):
+                for j, ev in enumerate(evidence_list, 1):
+                    st.markdown(f"{j}. {ev}")
+            else:
+                st.text(evidence_list)
+
+
+def display_job(job: dict):
+    status = job["status"]
+    results = [r for r in job["results"] if r is not None]
+    
+    if status in ("queued", "running"):
+        total = job["total"]
+        if total is None:
+            st.info("⏳ Waiting for a free slot..." if status == "queued" else "🔄 Extracting claims...")
+        else:
+            st.progress(job["completed"] / total if total else 1.0,
+                        text=f"🔄 Verified {job['completed']} of {total} claim(s)")
+    elif status == "failed":
+        st.error(f"❌ Error during analysis: {job['error']}")
+    elif status == "interrupted":
+        st.warning(f"⚠️ {job['error']}. Results so far are shown below.")
+    elif status == "cancelled":
+        st.warning("🛑 Analysis cancelled. Results so far are shown below.")
+    
+    if job["finished"] and not job["claims"]:
+        if status == "done":
+            st.warning("⚠️ No verifiable claims found in the text")
+        return
+    
+    if status == "done":
+        reused_count = sum(1 for r in results if r.get("reused"))
+        st.success(f"✅ Found and verified {len(results)} claim(s)"
+                   + (f", {reused_count} unchanged and reused" if reused_count else ""))
+    
+    if results:
+        true_count = sum(1 for r in results if "true" in r['verdict'].lower())
+        false_count = sum(1 for r in results if "false" in r['verdict'].lower())
+        not_checked_count = sum(1 for r in results if r.get("checked") is False)
+        unverifiable_count = len(results) - true_count - false_count - not_checked_count
+        
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("✅ True", true_count)
+        col2.metric("❌ False", false_count)
+        col3.metric("🤷♂️ Unverifiable", unverifiable_count)
+        col4.metric("⏱️ Not Checked", not_checked_count)
+    
+    st.markdown("---")
+    
+    for i, (claim, result) in enumerate(zip(job["claims"], job["results"]), 1):
+        display_text_result(i, claim, result)
+
+
+@st.fragment(run_every=ANALYSIS_POLL_INTERVAL)
+def poll_job(job_id: str):
+    # Only this fragment reruns on the timer; the rest of the page stays interactive
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None or job["finished"]:
+        st.rerun()
+    
+    if st.button("🛑 Cancel Analysis", key=f"cancel_{job_id}"):
+        manager.cancel(job_id)
+    display_job(job)
+
+
 with st.sidebar:
     st.header("⚙️ Settings")
     
@@ -56,6 +160,14 @@ with st.sidebar:
         help="spaCy: Fast, rule-based | LLM: More accurate, uses API calls"
     )
     
+    time_budget = st.number_input(
+        "Text Analysis Time Budget (seconds)",
+        min_value=0,
+        value=0,
+        step=5,
+        help="0 means no limit. When the budget runs out, claims not yet verified are listed as not checked."
+    )
+    
     show_evidence = st.checkbox("Show Evidence", value=True)
     show_metadata = st.checkbox("Show Source Metadata", value=False)
     
@@ -92,19 +204,33 @@ with tab1:
             try:
                 pipeline = get_pipeline()
                 
-                with st.spinner("🔄 Verifying claim..."):
-                    result = pipeline.verify_claim(claim_input)
-                
                 st.markdown("---")
                 st.subheader("📊 Verification Result")
                 
                 col1, col2 = st.columns([2, 1])
                 with col1:
-                    display_verdict(result.get("verdict", "Unverifiable"), result.get("confidence"))
-                
+                    verdict_slot = st.empty()
                 st.markdown("### 🧠 Reasoning")
-                reasoning = result.get("reasoning", "No reasoning available")
-                st.info(reasoning)
+                reasoning_slot = st.empty()
+                
+                # A provisional verdict is shown as soon as it streams in; the reasoning keeps filling in below it
+                result = {}
+                reasoning = ""
+                with st.spinner("🔄 Verifying claim..."):
+                    for event in pipeline.verify_claim_stream(claim_input):
+                        if event["type"] == "verdict":
+                            with verdict_slot.container():
+                                display_verdict(event["verdict"], event["confidence"])
+                                st.caption("⏳ Provisional: final once the reasoning is complete")
+                        elif event["type"] == "reasoning":
+                            reasoning += event["text"]
+                            reasoning_slot.info(reasoning + "▌")
+                        elif event["type"] == "result":
+                            result = event["result"]
+                
+                with verdict_slot.container():
+                    display_verdict(result.get("verdict", "Unverifiable"), result.get("confidence"))
+                reasoning_slot.info(result.get("reasoning", "No reasoning available"))
                 
                 if show_evidence and result.get("evidence"):
                     st.markdown("### 📚 Evidence")
@@ -141,51 +267,32 @@ with tab2:
             st.warning("⚠️ Please enter text to analyze")
         else:
             try:
-                pipeline = get_pipeline()
-                
-                with st.spinner("🔄 Extracting claims and verifying..."):
-                    results = pipeline.verify_text(text_input, extract_claims=True, method=extraction_method)
-                
-                if not results:
-                    st.warning("⚠️ No verifiable claims found in the text")
-                else:
-                    st.success(f"✅ Found and verified {len(results)} claim(s)")
-                    
-                    true_count = sum(1 for r in results if "true" in r['verdict'].lower())
-                    false_count = sum(1 for r in results if "false" in r['verdict'].lower())
-                    unverifiable_count = len(results) - true_count - false_count
-                    
-                    col1, col2, col3 = st.columns(3)
-                    col1.metric("✅ True", true_count)
-                    col2.metric("❌ False", false_count)
-                    col3.metric("🤷♂️ Unverifiable", unverifiable_count)
-                    
-                    st.markdown("---")
-                    
-                    for i, result in enumerate(results, 1):
-                        claim_text = result.get('claim', '')[:100]
-                        with st.expander(f"**Claim {i}**: {claim_text}...", expanded=True):
-                            st.markdown("**📝 Full Claim:**")
-                            st.info(result.get("claim", ""))
-                            
-                            display_verdict(result.get("verdict", "Unverifiable"), result.get("confidence"))
-                            
-                            st.markdown("**🧠 Reasoning:**")
-                            reasoning = result.get("reasoning", "No reasoning available")
-                            st.markdown(reasoning)
-                            
-                            if show_evidence and result.get("evidence"):
-                                st.markdown("**📚 Evidence:**")
-                                evidence_list = result.get("evidence", [])
-                                if isinstance(evidence_list, list):
-                                    for j, ev in enumerate(evidence_list, 1):
-                                        st.markdown(f"{j}. {ev}")
-                                else:
-                                    st.text(evidence_list)
-            
+                job_id = get_job_manager().submit(
+                    text_input,
+                    method=extraction_method,
+                    deadline=float(time_budget) if time_budget else None,
+                    owner=st.session_state.session_id
+                )
+                # Kept in the URL too, so a reload comes back to the same job
+                st.session_state.analysis_job = job_id
+                st.query_params["job"] = job_id
             except Exception as e:
-                st.error(f"❌ Error during analysis: {str(e)}")
-                logger.error(f"Analysis error: {str(e)}")
+                st.error(f"❌ Error starting analysis: {str(e)}")
+                logger.error(f"Analysis submission error: {str(e)}")
+    
+    job_id = st.session_state.get("analysis_job") or st.query_params.get("job")
+    if job_id:
+        try:
+            job = get_job_manager().get(job_id)
+            if job is None:
+                st.warning("⚠️ This analysis job no longer exists")
+            elif job["finished"]:
+                display_job(job)
+            else:
+                poll_job(job_id)
+        except Exception as e:
+            st.error(f"❌ Error during analysis: {str(e)}")
+            logger.error(f"Analysis error: {str(e)}")
 
 
 with tab3:
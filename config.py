@@ -3,13 +3,59 @@ CLAUDE_MODEL = "claude-haiku-4-5-20251001"
 CLAUDE_MAX_TOKENS = 4096
 CLAUDE_TEMPERATURE = 0.0
 
+# Structured Output Budgets (tool-use calls)
+VERIFICATION_MAX_TOKENS = 300
+RERANK_MAX_TOKENS = 60
+CLAIM_EXTRACTION_MAX_TOKENS = 1024
+
+# Prompt Caching (static system prompts and tool definitions)
+# Off by default: the static prefixes are a few hundred tokens, below the minimum the API
+# caches for Haiku models (4096 tokens for Haiku 4.5), so the markers would never hit.
+# Turn it on with a model or prompts whose prefix crosses that model's minimum.
+PROMPT_CACHING_ENABLED = False
+
+# LLM Deadlines, Hedging and Circuit Breaking
+LLM_CALL_TIMEOUT = 20.0  # seconds per API call
+LLM_MAX_RETRIES = 2  # retried by LLMClient itself, only while the request deadline allows
+LLM_MIN_ATTEMPT_SECONDS = 0.25  # no LLM attempt starts with less budget left than this
+REQUEST_DEADLINE_SECONDS = 45.0  # budget for one verify_claim
+LLM_HEDGE_ENABLED = True
+LLM_HEDGE_PERCENTILE = 95  # send a duplicate once a call is slower than this percentile
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_DEFAULT_DELAY = 3.0  # seconds, until enough latencies are recorded
+LLM_HEDGE_POOL_SIZE = 16
+LLM_BREAKER_WINDOW = 20
+LLM_BREAKER_MIN_CALLS = 10
+LLM_BREAKER_ERROR_RATE = 0.5
+LLM_BREAKER_LATENCY_SECONDS = 15.0
+LLM_BREAKER_LATENCY_PERCENTILE = 90
+LLM_BREAKER_COOLDOWN = 30.0
+
 # Embedding Model Configuration
 EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
 EMBEDDING_DIMENSION = 384
 EMBEDDING_DEVICE = "cpu"
+EMBEDDING_BACKEND = "torch"  # "torch", "onnx" or "torch-int8"
+EMBEDDING_NUM_THREADS = None  # None keeps the backend default
+EMBEDDING_TOKEN_BUDGET = 8192  # padded tokens per encode batch
+EMBEDDING_MAX_BATCH_SIZE = 128
 
 # Claim Extraction Model
 SPACY_MODEL = "en_core_web_sm"
+CLAIM_CHUNK_MAX_CHARS = 3000
+CLAIM_EXTRACTION_MAX_WORKERS = 4
+CLAIM_EXTRACTION_RETRIES = 2
+CLAIM_DEDUP_SIMILARITY = 0.92
+
+# Text Verification Budget
+VERIFY_TEXT_DEADLINE_SECONDS = None  # overall budget for verify_text; None means no limit
+VERIFY_TEXT_MAX_WORKERS = 4
+CLAIM_PRIORITY_CHECKABILITY_WEIGHT = 0.5  # the rest of the priority comes from retrieval coverage
+
+# Incremental Re-verification Configuration
+INCREMENTAL_CACHE_MAX_CHUNKS = 20000
+INCREMENTAL_CACHE_MAX_RESULTS = 20000
+INCREMENTAL_RESULT_TTL_SECONDS = 3600.0
 
 # Similarity and Verification Thresholds
 SIMILARITY_THRESHOLD = 0.65
@@ -17,13 +63,67 @@ VERIFICATION_CONFIDENCE_THRESHOLD = 0.6
 TOP_K_RETRIEVAL = 5
 TOP_K_RERANK = 3
 
+# Lexical (BM25) and Hybrid Retrieval Configuration
+RETRIEVAL_MODE = "hybrid"  # "dense", "hybrid" or "lexical"
+LEXICAL_INDEX_ENABLED = True
+LEXICAL_INDEX_FILE = "lexical_index.npz"  # one per collection: <collection>.lexical_index.npz
+BM25_K1 = 1.5
+BM25_B = 0.75
+HYBRID_DENSE_WEIGHT = 0.7
+HYBRID_CANDIDATE_MULTIPLIER = 2
+LEXICAL_SHORTCUT_COVERAGE = 0.9  # query-term coverage that skips the vector query
+LEXICAL_SHORTCUT_MIN_TERMS = 5
+LEXICAL_MIN_COVERAGE = 0.6
+LEXICAL_MIN_SIMILARITY = 0.35  # cosine a covered term-match still needs to count as on-topic
+
 # ChromaDB Configuration
 CHROMA_DB_PATH = "./data/chroma_db"
 COLLECTION_NAME = "verified_facts"
+ACTIVE_COLLECTION_FILE = "active_collection.json"
+ACTIVE_COLLECTION_CHECK_INTERVAL = 5.0  # seconds between pointer checks
+
+# Vector Index (HNSW) Configuration; tune with scripts/tune_index.py
+VECTOR_SPACE = "cosine"  # "cosine", "ip" or "l2"; fixed when a collection is created
+HNSW_M = 16  # graph links per node; more raises recall, memory and build time
+HNSW_EF_CONSTRUCTION = 100  # candidate list while building; fixed when a collection is created
+HNSW_EF_SEARCH = 100  # candidate list while querying; applied to the active collection at startup
+
+# Embedding Migration Configuration
+MIGRATION_BATCH_SIZE = 64
+MIGRATION_MAX_FACTS_PER_SECOND = 200
+
+# Snapshot Configuration
+SNAPSHOT_DIR = "./data/snapshots"
+SNAPSHOT_DTYPE = "float32"  # "float32" or "float16"
+SNAPSHOT_BATCH_SIZE = 2000
 
 # Data Configuration
 VERIFIED_FACTS_CSV = "./data/verified_facts.csv"
 
+# Ingest-time Deduplication
+DEDUP_ENABLED = True
+DEDUP_SIMILARITY_THRESHOLD = 0.93  # cosine; restatements of one fact, not merely related facts
+DEDUP_LSH_TABLES = 16  # more tables find more near-duplicates, at more comparisons
+DEDUP_LSH_BITS = 10  # more bits make smaller buckets
+DEDUP_QUERY_BATCH_SIZE = 256  # vectors per lookup against facts already stored
+
+# Worker Pool Configuration
+WORKER_POOL_SIZE = 4
+WORKER_TORCH_THREADS = 1
+
+# Work Queue Configuration
+WORK_QUEUE_URL = "sqlite:///./data/work_queue.db"
+WORK_QUEUE_LEASE_SECONDS = 120.0  # visibility timeout, extended by heartbeats while a job runs
+WORK_QUEUE_MAX_ATTEMPTS = 3  # then the job is dead-lettered
+WORK_QUEUE_RETRY_BACKOFF = 5.0  # seconds, doubled on each retry
+WORK_QUEUE_POLL_INTERVAL = 1.0
+
+# Background Analysis Jobs (Streamlit app)
+ANALYSIS_JOBS_DB = "./data/analysis_jobs.db"
+ANALYSIS_MAX_CONCURRENT_JOBS = 2  # across all sessions; further jobs wait in the queue
+ANALYSIS_POLL_INTERVAL = 1.0  # seconds between UI refreshes of a running job
+ANALYSIS_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
 # Streamlit Configuration
 STREAMLIT_TITLE = "🔍 LLM Fact Checker"
 STREAMLIT_DESCRIPTION = """
@@ -36,6 +136,19 @@ Verify claims against a database of verified facts using:
 # Logging Configuration
 LOG_LEVEL = "INFO"
 LOG_FILE = "./logs/fact_checker.log"
+LOG_FORMAT = "json"  # "json" or "text"
+LOG_QUEUE_SIZE = 10000
+# Per-claim INFO logs are sampled too; warnings and errors are always kept
+LOG_SAMPLE_RATES = {
+    "retriever.top_result": 0.1,
+    "llm.response": 0.1,
+    "store.search": 0.1,
+    "retriever.retrieved": 0.1,
+    "pipeline.claim": 0.1,
+    "pipeline.evidence": 0.1,
+    "pipeline.verdict": 0.1,
+    "llm.verdict": 0.1
+}
 
 # Verdict Configuration
 VERDICTS = {
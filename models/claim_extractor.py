@@ -1,7 +1,16 @@
+import contextvars
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
+import numpy as np
 import spacy
 
-from config import SPACY_MODEL
+from config import (
+    SPACY_MODEL, CLAIM_CHUNK_MAX_CHARS, CLAIM_EXTRACTION_MAX_WORKERS,
+    CLAIM_EXTRACTION_RETRIES, CLAIM_DEDUP_SIMILARITY, CLAIM_EXTRACTION_MAX_TOKENS
+)
+from models.llm_client import OutputTruncatedError
 from utils.logger import logger
 
 
@@ -47,30 +56,116 @@ class ClaimExtractor:
             if has_verb and has_noun:
                 claims.append(sent_text)
         
-        logger.info(f"Extracted {len(claims)} claims using spaCy")
+        logger.info("Extracted %d claims using spaCy", len(claims))
         return claims
     
-    def extract_claims_llm(self, text: str, llm_client) -> List[str]:
-        from utils.prompts import CLAIM_EXTRACTION_PROMPT
+    @staticmethod
+    def split_into_chunks(text: str, max_chars: int = None) -> List[str]:
+        max_chars = max_chars or CLAIM_CHUNK_MAX_CHARS
         
-        prompt = CLAIM_EXTRACTION_PROMPT.format(text=text)
+        pieces = []
+        for paragraph in re.split(r'\n\s*\n', text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= max_chars:
+                pieces.append(paragraph)
+                continue
+            for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+                sentence = sentence.strip()
+                # A single run-on sentence longer than the budget is hard-split
+                while len(sentence) > max_chars:
+                    pieces.append(sentence[:max_chars])
+                    sentence = sentence[max_chars:]
+                if sentence:
+                    pieces.append(sentence)
         
-        try:
-            response = llm_client.generate(prompt)
-            
-            claims = []
-            for line in response.strip().split('\n'):
-                line = line.strip()
-                if line and len(line) > 2:
-                    if line[0].isdigit():
-                        line = line.split('.', 1)[-1].strip()
-                    if line:
-                        claims.append(line)
-            
-            logger.info(f"Extracted {len(claims)} claims using LLM")
-            return claims
-            
-        except Exception as e:
-            logger.error(f"Error extracting claims with LLM: {str(e)}")
-            logger.info("Falling back to spaCy extraction")
-            return self.extract_claims(text)
\ No newline at end of file
+        chunks = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    def _extract_chunk_llm(self, chunk: str, llm_client) -> List[str]:
+        from utils.prompts import CLAIM_EXTRACTION_PROMPT, CLAIM_EXTRACTION_SYSTEM_PROMPT, CLAIM_EXTRACTION_TOOL
+        
+        prompt = CLAIM_EXTRACTION_PROMPT.format(text=chunk)
+        
+        for attempt in range(CLAIM_EXTRACTION_RETRIES + 1):
+            try:
+                result = llm_client.generate_structured(
+                    prompt, CLAIM_EXTRACTION_TOOL, system_prompt=CLAIM_EXTRACTION_SYSTEM_PROMPT,
+                    max_tokens=CLAIM_EXTRACTION_MAX_TOKENS
+                )
+                return [str(claim).strip() for claim in result['claims'] if len(str(claim).strip()) > 2]
+            except OutputTruncatedError as e:
+                # Already retried with the largest budget; another attempt would be cut off the same way
+                logger.error("Error extracting claims with LLM: %s", e)
+                break
+            except Exception as e:
+                if attempt < CLAIM_EXTRACTION_RETRIES:
+                    logger.warning("Chunk extraction attempt %d failed: %s, retrying", attempt + 1, e)
+                    time.sleep(0.5 * 2 ** attempt)
+                else:
+                    logger.error("Error extracting claims with LLM: %s", e)
+        
+        # Only this chunk falls back to spaCy; the rest of the document keeps its LLM claims
+        logger.info("Falling back to spaCy extraction for one chunk")
+        return self.extract_claims(chunk)
+    
+    @staticmethod
+    def deduplicate_claims(claims: List[str], embedder=None, threshold: float = None) -> List[str]:
+        threshold = threshold or CLAIM_DEDUP_SIMILARITY
+        
+        seen = set()
+        unique = []
+        for claim in claims:
+            key = " ".join(claim.lower().split()).rstrip('.')
+            if key not in seen:
+                seen.add(key)
+                unique.append(claim)
+        
+        if embedder is None or len(unique) < 2:
+            return unique
+        
+        embeddings = np.asarray(embedder.embed_documents(unique), dtype=np.float32)
+        similarities = embeddings @ embeddings.T
+        
+        kept = []
+        for i in range(len(unique)):
+            if all(similarities[i, j] < threshold for j in kept):
+                kept.append(i)
+        
+        if len(kept) < len(unique):
+            logger.info("Removed %d near-duplicate claims", len(unique) - len(kept))
+        return [unique[i] for i in kept]
+    
+    def extract_claims_llm(self, text: str, llm_client, embedder=None) -> List[str]:
+        chunks = self.split_into_chunks(text)
+        if not chunks:
+            return []
+        
+        if len(chunks) == 1:
+            chunk_claims = [self._extract_chunk_llm(chunks[0], llm_client)]
+        else:
+            workers = min(CLAIM_EXTRACTION_MAX_WORKERS, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Each chunk runs in a copy of the caller's context, so its logs keep the request ID
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._extract_chunk_llm, chunk, llm_client)
+                    for chunk in chunks
+                ]
+                chunk_claims = [future.result() for future in futures]
+        
+        claims = [claim for claims in chunk_claims for claim in claims]
+        claims = self.deduplicate_claims(claims, embedder=embedder)
+        
+        logger.info("Extracted %d claims using LLM from %d chunks", len(claims), len(chunks))
+        return claims
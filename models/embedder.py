@@ -1,51 +1,158 @@
-from typing import List, Union
+from typing import Dict, List, Union
+import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
 
-from config import EMBEDDING_MODEL, EMBEDDING_DEVICE
+from config import (
+    EMBEDDING_MODEL, EMBEDDING_DEVICE, EMBEDDING_BACKEND, EMBEDDING_NUM_THREADS,
+    EMBEDDING_TOKEN_BUDGET, EMBEDDING_MAX_BATCH_SIZE
+)
 from utils.logger import logger
 
 
+EMBEDDING_BACKENDS = ("torch", "onnx", "torch-int8")
+
+
 class Embedder:
     
-    def __init__(self, model_name: str = None, device: str = None):
+    def __init__(self, model_name: str = None, device: str = None, backend: str = None, num_threads: int = None):
         self.model_name = model_name or EMBEDDING_MODEL
         self.device = device or EMBEDDING_DEVICE
+        self.backend = backend or EMBEDDING_BACKEND
+        self.num_threads = num_threads or EMBEDDING_NUM_THREADS
+        
+        if self.backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{self.backend}', expected one of {EMBEDDING_BACKENDS}")
         
-        logger.info(f"Loading embedding model: {self.model_name} on {self.device}")
+        logger.info(f"Loading embedding model: {self.model_name} on {self.device} (backend: {self.backend})")
         
         try:
-            self.model = SentenceTransformer(self.model_name, device=self.device)
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            
+            if self.backend == "onnx":
+                self.model = self._load_onnx()
+            elif self.backend == "torch-int8":
+                self.model = self._load_torch_int8()
+            else:
+                self.model = SentenceTransformer(self.model_name, device=self.device)
             logger.info(f"Embedding model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading embedding model: {str(e)}")
             raise
     
-    def embed(self, text: Union[str, List[str]], normalize: bool = True) -> Union[List[float], List[List[float]]]:
+    def _load_onnx(self) -> SentenceTransformer:
         try:
-            if isinstance(text, str):
-                text = [text]
-            
-            embeddings = self.model.encode(
-                text,
-                normalize_embeddings=normalize,
-                convert_to_numpy=True,
-                show_progress_bar=False
-            )
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx embedding backend requires: pip install onnxruntime optimum[onnxruntime]")
+        
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            session_options.intra_op_num_threads = self.num_threads
+            session_options.inter_op_num_threads = 1
+        self._onnx_session_options = session_options
+        
+        # Exports from the locally cached Hugging Face weights on first load
+        return SentenceTransformer(
+            self.model_name,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"provider": "CPUExecutionProvider", "session_options": session_options}
+        )
+    
+    def _load_torch_int8(self) -> SentenceTransformer:
+        if self.device != "cpu":
+            logger.warning("Dynamic int8 quantization only runs on CPU, ignoring device %s", self.device)
+            self.device = "cpu"
+        
+        model = SentenceTransformer(self.model_name, device="cpu")
+        model.eval()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    
+    def thread_settings(self) -> Dict:
+        settings = {"backend": self.backend}
+        if self.backend == "onnx":
+            options = self._onnx_session_options
+            settings["intra_op_num_threads"] = options.intra_op_num_threads or "onnxruntime default"
+            settings["inter_op_num_threads"] = options.inter_op_num_threads or "onnxruntime default"
+        else:
+            settings["intra_op_num_threads"] = torch.get_num_threads()
+            settings["inter_op_num_threads"] = torch.get_num_interop_threads()
+        return settings
+    
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            # Rough estimate when the backend exposes no tokenizer
+            return [len(text) // 4 + 2 for text in texts]
+        
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+    
+    def plan_batches(self, lengths: List[int], token_budget: int = None, max_batch_size: int = None) -> List[List[int]]:
+        token_budget = token_budget or EMBEDDING_TOKEN_BUDGET
+        max_batch_size = max_batch_size or EMBEDDING_MAX_BATCH_SIZE
+        
+        # Sorted by length, each batch pads to its last (longest) entry
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        batches = []
+        current = []
+        for i in order:
+            padded_tokens = lengths[i] * (len(current) + 1)
+            if current and (padded_tokens > token_budget or len(current) >= max_batch_size):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+    
+    def embed(self, text: Union[str, List[str]], normalize: bool = True, token_budget: int = None) -> np.ndarray:
+        try:
+            single = isinstance(text, str)
+            texts = [text] if single else list(text)
             
-            # Convert to list format
-            if len(embeddings) == 1:
-                return embeddings[0].tolist()
+            if len(texts) <= 1:
+                embeddings = self.model.encode(
+                    texts,
+                    normalize_embeddings=normalize,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
             else:
-                return embeddings.tolist()
+                batches = self.plan_batches(self.token_lengths(texts), token_budget=token_budget)
+                embeddings = None
+                for batch in batches:
+                    batch_embeddings = self.model.encode(
+                        [texts[i] for i in batch],
+                        batch_size=len(batch),
+                        normalize_embeddings=normalize,
+                        convert_to_numpy=True,
+                        show_progress_bar=False
+                    )
+                    if embeddings is None:
+                        embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=batch_embeddings.dtype)
+                    # Scatter back so rows follow the caller's order
+                    embeddings[batch] = batch_embeddings
+            
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            return embeddings[0] if single else embeddings
         
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
     
-    def embed_query(self, query: str) -> List[float]:
+    def embed_query(self, query: str) -> np.ndarray:
         return self.embed(query, normalize=True)
     
-    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+    def embed_documents(self, documents: List[str]) -> np.ndarray:
         return self.embed(documents, normalize=True)
-
@@ -1,30 +1,270 @@
 import os
 import json
-from typing import Dict, Optional
-from anthropic import Anthropic
+import contextvars
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from anthropic import Anthropic, APIConnectionError, APIStatusError, APITimeoutError
 from dotenv import load_dotenv
 
-from config import CLAUDE_MODEL, CLAUDE_MAX_TOKENS, CLAUDE_TEMPERATURE
+from config import (
+    CLAUDE_MODEL, CLAUDE_MAX_TOKENS, CLAUDE_TEMPERATURE, LLM_CALL_TIMEOUT, LLM_MAX_RETRIES, LLM_MIN_ATTEMPT_SECONDS,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_DEFAULT_DELAY,
+    LLM_HEDGE_POOL_SIZE, LLM_BREAKER_WINDOW, LLM_BREAKER_MIN_CALLS, LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_LATENCY_SECONDS, LLM_BREAKER_LATENCY_PERCENTILE, LLM_BREAKER_COOLDOWN,
+    VERIFICATION_MAX_TOKENS, PROMPT_CACHING_ENABLED
+)
 from utils.logger import logger
+from utils.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyTracker, remaining_time
+from utils.streaming_json import IncrementalJSONParser
 
 load_dotenv()
 
 
+class StructuredOutputError(ValueError):
+    pass
+
+
+class OutputTruncatedError(StructuredOutputError):
+    pass
+
+
+def is_failed_verification(result: Dict) -> bool:
+    # Degraded (breaker open, deadline) and errored verifications carry no LLM verdict
+    return bool(result.get("degraded") or result.get("failed"))
+
+
 class LLMClient:
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, max_retries: Optional[int] = None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
         
-        self.client = Anthropic(api_key=self.api_key)
+        # base_url points the client at a local stand-in such as utils.fake_llm_server.
+        # The SDK never retries on its own: each of its retries would get a fresh timeout
+        # and run past the request deadline, so _with_retries retries within the budget.
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        client_params = {"api_key": self.api_key, "max_retries": 0}
+        if base_url is not None:
+            client_params["base_url"] = base_url
+        self.client = Anthropic(**client_params)
         self.model = CLAUDE_MODEL
         self.max_tokens = CLAUDE_MAX_TOKENS
         self.temperature = CLAUDE_TEMPERATURE
         
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(
+            window=LLM_BREAKER_WINDOW,
+            min_calls=LLM_BREAKER_MIN_CALLS,
+            error_rate=LLM_BREAKER_ERROR_RATE,
+            latency_threshold=LLM_BREAKER_LATENCY_SECONDS,
+            latency_percentile=LLM_BREAKER_LATENCY_PERCENTILE,
+            cooldown=LLM_BREAKER_COOLDOWN
+        )
+        self._executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_POOL_SIZE, thread_name_prefix="llm-hedge")
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "calls": 0, "successes": 0, "failures": 0, "timeouts": 0, "deadline_exceeded": 0,
+            "breaker_rejected": 0, "retries": 0, "hedges_sent": 0, "hedge_wins": 0, "output_tokens": 0,
+            "input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0
+        }
+        self.tool_stats: Dict[str, Dict] = {}
+        
         logger.info(f"LLMClient initialized with model: {self.model}")
     
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> str:
+    def _count(self, key: str, delta: int = 1):
+        with self._stats_lock:
+            self.stats[key] += delta
+    
+    def _count_tool(self, name: str, key: str, delta: int = 1):
+        with self._stats_lock:
+            tool = self.tool_stats.setdefault(name, {
+                "calls": 0, "parse_failures": 0, "truncations": 0, "output_tokens": 0, "input_tokens": 0,
+                "cache_read_input_tokens": 0
+            })
+            tool[key] += delta
+    
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+            tools = {name: dict(tool) for name, tool in self.tool_stats.items()}
+        for tool in tools.values():
+            tool["parse_failure_rate"] = tool["parse_failures"] / tool["calls"] if tool["calls"] else 0.0
+            tool["avg_output_tokens"] = tool["output_tokens"] / tool["calls"] if tool["calls"] else 0.0
+        stats["structured"] = tools
+        stats["avg_output_tokens"] = stats["output_tokens"] / stats["successes"] if stats["successes"] else 0.0
+        prompt_tokens = stats["input_tokens"] + stats["cache_read_input_tokens"] + stats["cache_creation_input_tokens"]
+        stats["cache_hit_rate"] = stats["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        stats["breaker"] = self.breaker.get_stats()
+        stats["latency_p50"] = self.latency.percentile(50)
+        stats["latency_p95"] = self.latency.percentile(95)
+        stats["hedge_delay"] = self._hedge_delay()
+        return stats
+    
+    def _call_timeout(self) -> float:
+        remaining = remaining_time()
+        if remaining is None:
+            return LLM_CALL_TIMEOUT
+        if remaining < LLM_MIN_ATTEMPT_SECONDS:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded("Request deadline exceeded before LLM call")
+        return min(LLM_CALL_TIMEOUT, remaining)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        # Same errors the SDK would retry (connection errors, full timeouts, 408/409/429, 5xx and
+        # 529 overload), but only while the next attempt still fits in the request budget
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, APIStatusError):
+            if error.status_code not in (408, 409, 429) and error.status_code < 500:
+                return None
+        elif not isinstance(error, APIConnectionError):
+            return None
+        
+        delay = min(0.5 * 2 ** attempt, 8.0) * random.uniform(0.75, 1.0)
+        response = getattr(error, "response", None)
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+            if 0 < retry_after <= 60:
+                delay = retry_after
+        except (AttributeError, TypeError, ValueError):
+            pass
+        
+        remaining = remaining_time()
+        if remaining is not None and remaining - delay < LLM_MIN_ATTEMPT_SECONDS:
+            return None
+        return delay
+    
+    def _with_retries(self, call: Callable):
+        for attempt in itertools.count():
+            try:
+                return call()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                self._count("retries")
+                logger.warning("LLM call failed (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+    
+    def _record_failure(self, error: Exception, started: float, out_of_budget: bool) -> Exception:
+        # A call cut short by the caller's own deadline says nothing about the API's health:
+        # it releases a half-open trial instead of counting against the breaker
+        if out_of_budget:
+            self.breaker.release()
+            self._count("deadline_exceeded")
+            if isinstance(error, DeadlineExceeded):
+                return error
+            return DeadlineExceeded(f"Request deadline exceeded during LLM call: {error}")
+        self.breaker.record(False, time.monotonic() - started)
+        self._count("failures")
+        if isinstance(error, (APITimeoutError, DeadlineExceeded)):
+            self._count("timeouts")
+        return error
+    
+    def _hedge_delay(self) -> float:
+        delay = self.latency.percentile(LLM_HEDGE_PERCENTILE, min_samples=LLM_HEDGE_MIN_SAMPLES)
+        return delay if delay is not None else LLM_HEDGE_DEFAULT_DELAY
+    
+    def _submit(self, api_params: Dict, timeout: float):
+        # Each attempt runs in its own copy of the caller's context (request ID, deadline)
+        return self._executor.submit(
+            contextvars.copy_context().run, self.client.messages.create, timeout=timeout, **api_params
+        )
+    
+    def _hedged_create(self, api_params: Dict, timeout: float):
+        started = time.monotonic()
+        primary = self._submit(api_params, timeout)
+        
+        done, _ = wait([primary], timeout=min(self._hedge_delay(), timeout))
+        if done:
+            return primary.result()
+        
+        # The slow attempt keeps running; whichever answers first wins
+        remaining = timeout - (time.monotonic() - started)
+        self._count("hedges_sent")
+        hedge = self._submit(api_params, max(remaining, 0.001))
+        
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"LLM call did not finish within {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+    
+    def _create(self, api_params: Dict, hedge: bool = False):
+        return self._with_retries(lambda: self._create_once(api_params, hedge))
+    
+    def _create_once(self, api_params: Dict, hedge: bool = False):
+        self._count("calls")
+        timeout = self._call_timeout()
+        if not self.breaker.allow():
+            self._count("breaker_rejected")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        started = time.monotonic()
+        try:
+            if hedge and LLM_HEDGE_ENABLED:
+                response = self._hedged_create(api_params, timeout)
+            else:
+                response = self.client.messages.create(timeout=timeout, **api_params)
+        except Exception as e:
+            # A timeout the deadline shortened is the budget's fault; a full LLM_CALL_TIMEOUT is the API's
+            out_of_budget = isinstance(e, (APITimeoutError, DeadlineExceeded)) and timeout < LLM_CALL_TIMEOUT
+            error = self._record_failure(e, started, out_of_budget)
+            if error is e:
+                raise
+            raise error from e
+        except BaseException:
+            # Interrupted without an outcome; a half-open trial must not stay claimed
+            self.breaker.release()
+            raise
+        
+        latency = time.monotonic() - started
+        self.breaker.record(True, latency)
+        self.latency.record(latency)
+        self._count("successes")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self._count("output_tokens", usage.output_tokens or 0)
+            self._count_input_usage(usage)
+        return response
+    
+    def _count_input_usage(self, usage, tool_name: Optional[str] = None):
+        # input_tokens counts only the uncached part of the prompt; cached prefix tokens
+        # are reported separately as read from or written to the cache
+        counts = {
+            key: getattr(usage, key, None) or 0
+            for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        }
+        if tool_name is not None:
+            self._count_tool(tool_name, "input_tokens", counts["input_tokens"])
+            self._count_tool(tool_name, "cache_read_input_tokens", counts["cache_read_input_tokens"])
+            return
+        for key, value in counts.items():
+            self._count(key, value)
+    
+    @staticmethod
+    def _system_param(system_prompt: str):
+        # The cache breakpoint on the system prompt covers everything before it too (the tool
+        # definitions), so only the claim/evidence message is processed from scratch
+        if not PROMPT_CACHING_ENABLED:
+            return system_prompt
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    
+    def generate(self, prompt: str, system_prompt: Optional[str] = None, hedge: bool = False, **kwargs) -> str:
         try:
             temperature = kwargs.get("temperature", self.temperature)
             max_tokens = kwargs.get("max_tokens", self.max_tokens)
@@ -39,82 +279,293 @@ class LLMClient:
             }
             
             if system_prompt is not None:
-                api_params["system"] = system_prompt
+                api_params["system"] = self._system_param(system_prompt)
             
-            response = self.client.messages.create(**api_params)
+            response = self._create(api_params, hedge=hedge)
             
             result = response.content[0].text
-            logger.debug(f"LLM generated response: {result[:100]}...")
+            logger.debug("LLM generated response: %.100s...", result, extra={"event": "llm.response"})
             return result
         
         except Exception as e:
-            logger.error(f"Error generating LLM response: {str(e)}")
+            logger.error("Error generating LLM response: %s", e)
             raise
     
-    def generate_json(self, prompt: str, system_prompt: Optional[str] = None, **kwargs) -> Dict:
+    @staticmethod
+    def _validate_tool_input(tool: Dict, data: Dict):
+        schema = tool["input_schema"]
+        for key in schema.get("required", []):
+            if key not in data:
+                raise StructuredOutputError(f"{tool['name']} output is missing '{key}'")
+        for key, spec in schema.get("properties", {}).items():
+            if key in data and "enum" in spec and data[key] not in spec["enum"]:
+                raise StructuredOutputError(f"{tool['name']} output has invalid {key}: {data[key]!r}")
+    
+    def _structured_params(self, prompt: str, tool: Dict, system_prompt: Optional[str] = None, **kwargs) -> Dict:
+        # Forcing the tool call makes the API return arguments that already follow the schema
+        api_params = {
+            "model": self.model,
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": [tool],
+            "tool_choice": {"type": "tool", "name": tool["name"]}
+        }
+        if system_prompt is not None:
+            api_params["system"] = self._system_param(system_prompt)
+        return api_params
+    
+    def _check_structured(self, tool: Dict, data: Dict):
         try:
-            response = self.generate(prompt, system_prompt, **kwargs)
-            
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            elif response.startswith("```"):
-                response = response[3:]
-            if response.endswith("```"):
-                response = response[:-3]
-            response = response.strip()
+            self._validate_tool_input(tool, data)
+        except StructuredOutputError as e:
+            self._count_tool(tool["name"], "parse_failures")
+            logger.warning("Structured output failed for %s: %s", tool["name"], e)
+            raise
+    
+    def generate_structured(self, prompt: str, tool: Dict, system_prompt: Optional[str] = None,
+                            hedge: bool = False, **kwargs) -> Dict:
+        name = tool["name"]
+        max_tokens = kwargs.pop("max_tokens", self.max_tokens)
+        while True:
+            response = self._create(
+                self._structured_params(prompt, tool, system_prompt, max_tokens=max_tokens, **kwargs), hedge=hedge
+            )
+            self._count_tool(name, "calls")
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self._count_tool(name, "output_tokens", usage.output_tokens or 0)
+                self._count_input_usage(usage, name)
+            if response.stop_reason != "max_tokens":
+                break
             
-            return json.loads(response)
+            # The tool input was cut off; the same budget would cut it off again
+            self._count_tool(name, "truncations")
+            if max_tokens >= self.max_tokens:
+                raise OutputTruncatedError(f"{name} output exceeded {max_tokens} tokens")
+            logger.warning("%s output hit max_tokens=%d, retrying with %d", name, max_tokens,
+                           min(max_tokens * 2, self.max_tokens))
+            max_tokens = min(max_tokens * 2, self.max_tokens)
+        
+        block = next((b for b in response.content if getattr(b, "type", None) == "tool_use" and b.name == name), None)
+        try:
+            if block is None:
+                raise StructuredOutputError(f"Response has no {name} tool call (stop_reason={response.stop_reason})")
+            data = block.input if isinstance(block.input, dict) else json.loads(block.input)
+        except (StructuredOutputError, json.JSONDecodeError) as e:
+            self._count_tool(name, "parse_failures")
+            logger.warning("Structured output failed for %s: %s", name, e)
+            raise StructuredOutputError(str(e)) from e
+        self._check_structured(tool, data)
+        
+        logger.debug("LLM structured output %s: %.100s", name, data, extra={"event": "llm.response"})
+        return data
+    
+    def _open_stream(self, api_params: Dict):
+        self._count("calls")
+        timeout = self._call_timeout()
+        if not self.breaker.allow():
+            self._count("breaker_rejected")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        started = time.monotonic()
+        try:
+            stream = self.client.messages.create(stream=True, timeout=timeout, **api_params)
+        except Exception as e:
+            out_of_budget = isinstance(e, APITimeoutError) and timeout < LLM_CALL_TIMEOUT
+            error = self._record_failure(e, started, out_of_budget)
+            if error is e:
+                raise
+            raise error from e
+        except BaseException:
+            self.breaker.release()
+            raise
+        return stream, timeout, started
+    
+    def stream_structured(self, prompt: str, tool: Dict, system_prompt: Optional[str] = None,
+                          **kwargs) -> Iterator[Tuple[str, Optional[str], Any]]:
+        # Yields ("delta", key, text) and ("field", key, value) while the tool input streams in,
+        # then ("done", None, data) with the validated input. Streams are never hedged.
+        name = tool["name"]
+        api_params = self._structured_params(prompt, tool, system_prompt, **kwargs)
+        # Only opening the stream is retried; nothing has been yielded at that point
+        stream, timeout, started = self._with_retries(lambda: self._open_stream(api_params))
         
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON response: {str(e)}")
-            logger.debug(f"Response was: {response}")
+        parser = IncrementalJSONParser()
+        output_tokens = 0
+        input_usage = None
+        stop_reason = None
+        try:
+            for event in stream:
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded("Request deadline exceeded while streaming")
+                
+                if event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    try:
+                        events = parser.feed(event.delta.partial_json)
+                    except ValueError as e:
+                        raise StructuredOutputError(f"{name} stream is not valid JSON: {e}") from e
+                    for item in events:
+                        yield item
+                elif event.type == "message_start":
+                    input_usage = getattr(event.message, "usage", None)
+                elif event.type == "message_delta":
+                    stop_reason = getattr(event.delta, "stop_reason", None)
+                    if getattr(event, "usage", None) is not None:
+                        output_tokens = event.usage.output_tokens or 0
+        except (GeneratorExit, StructuredOutputError) as e:
+            # The consumer stopped reading, or the model wrote malformed input; either way
+            # the API was answering, so count it as healthy
+            self.breaker.record(True, time.monotonic() - started)
+            if isinstance(e, StructuredOutputError):
+                self._count_tool(name, "calls")
+                self._count_tool(name, "parse_failures")
+                logger.warning("Structured output failed for %s: %s", name, e)
             raise
         except Exception as e:
-            logger.error(f"Error generating JSON response: {str(e)}")
+            out_of_budget = isinstance(e, DeadlineExceeded) or (
+                isinstance(e, APITimeoutError) and timeout < LLM_CALL_TIMEOUT
+            )
+            error = self._record_failure(e, started, out_of_budget)
+            if error is e:
+                raise
+            raise error from e
+        except BaseException:
+            # Interrupted without an outcome; a half-open trial must not stay claimed
+            self.breaker.release()
             raise
+        finally:
+            stream.close()
+        
+        latency = time.monotonic() - started
+        self.latency.record(latency)
+        self.breaker.record(True, latency)
+        self._count("successes")
+        self._count("output_tokens", output_tokens)
+        self._count_tool(name, "calls")
+        self._count_tool(name, "output_tokens", output_tokens)
+        if input_usage is not None:
+            self._count_input_usage(input_usage)
+            self._count_input_usage(input_usage, name)
+        
+        if not parser.done:
+            self._count_tool(name, "parse_failures")
+            if stop_reason == "max_tokens":
+                self._count_tool(name, "truncations")
+                raise OutputTruncatedError(f"{name} stream hit max_tokens before the tool input was complete")
+            raise StructuredOutputError(f"{name} stream ended before the tool input was complete")
+        self._check_structured(tool, parser.fields)
+        yield ("done", None, parser.fields)
+    
+    @staticmethod
+    def _map_verdict(verdict: str, confidence: float) -> str:
+        if verdict.upper() in ['TRUE', 'CORRECT', 'ACCURATE', 'YES']:
+            if confidence >= 0.8:
+                return "Definitely True"
+            elif confidence >= 0.6:
+                return "Likely True"
+            return "Possibly True"
+        elif verdict.upper() in ['FALSE', 'INCORRECT', 'INACCURATE', 'NO']:
+            if confidence >= 0.8:
+                return "Definitely False"
+            elif confidence >= 0.6:
+                return "Likely False"
+            return "Possibly False"
+        return "Unverifiable"
+    
+    @staticmethod
+    def _clamp_confidence(value) -> float:
+        return min(max(float(value), 0.0), 1.0)
+    
+    @staticmethod
+    def _failed_verification(e: Exception) -> Dict:
+        if isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+            # Degraded mode: the caller still gets the retrieved evidence, just no LLM verdict
+            logger.warning("LLM verification skipped: %s", e)
+            return {
+                "verdict": "Unverifiable",
+                "confidence": 0.0,
+                "reasoning": f"LLM verification unavailable ({str(e)}). Showing retrieved evidence only.",
+                "degraded": True
+            }
+        logger.error("Error verifying claim: %s", e)
+        return {
+            "verdict": "Unverifiable",
+            "confidence": 0.0,
+            "reasoning": f"Error during verification: {str(e)}",
+            "failed": True
+        }
     
     def verify_claim(self, claim: str, evidence: str) -> Dict:
-        from utils.prompts import VERIFICATION_PROMPT
+        from utils.prompts import VERIFICATION_PROMPT, VERIFICATION_SYSTEM_PROMPT, VERIFICATION_TOOL
         
         prompt = VERIFICATION_PROMPT.format(claim=claim, evidence=evidence)
         
         try:
-            result = self.generate_json(prompt)
+            result = self.generate_structured(
+                prompt, VERIFICATION_TOOL, system_prompt=VERIFICATION_SYSTEM_PROMPT,
+                hedge=True, max_tokens=VERIFICATION_MAX_TOKENS
+            )
             
-            verdict = result.get('verdict', 'Unverifiable')
-            confidence = result.get('confidence', 0.5)
-            
-            if verdict.upper() in ['TRUE', 'CORRECT', 'ACCURATE', 'YES']:
-                if confidence >= 0.8:
-                    verdict = "Definitely True"
-                elif confidence >= 0.6:
-                    verdict = "Likely True"
-                else:
-                    verdict = "Possibly True"
-            elif verdict.upper() in ['FALSE', 'INCORRECT', 'INACCURATE', 'NO']:
-                if confidence >= 0.8:
-                    verdict = "Definitely False"
-                elif confidence >= 0.6:
-                    verdict = "Likely False"
-                else:
-                    verdict = "Possibly False"
-            else:
-                verdict = "Unverifiable"
+            confidence = self._clamp_confidence(result.get('confidence', 0.5))
+            verdict = self._map_verdict(result.get('verdict', 'Unverifiable'), confidence)
             
             output = {
                 "verdict": verdict,
-                "confidence": float(confidence),
+                "confidence": confidence,
                 "reasoning": result.get('reasoning', result.get('explanation', 'No reasoning provided'))
             }
             
-            logger.info(f"Claim verification: {verdict} (confidence: {confidence:.2f})")
+            logger.info("Claim verification: %s (confidence: %.2f)", verdict, confidence, extra={"event": "llm.verdict"})
             return output
             
         except Exception as e:
-            logger.error(f"Error verifying claim: {str(e)}")
-            return {
-                "verdict": "Unverifiable",
-                "confidence": 0.0,
-                "reasoning": f"Error during verification: {str(e)}"
-            }
\ No newline at end of file
+            return self._failed_verification(e)
+    
+    def verify_claim_stream(self, claim: str, evidence: str) -> Iterator[Dict]:
+        # Yields {"type": "verdict"} as soon as the verdict and confidence are out, then
+        # {"type": "reasoning", "text": ...} pieces, and finally {"type": "result", "result": ...}
+        from utils.prompts import VERIFICATION_PROMPT, VERIFICATION_SYSTEM_PROMPT, VERIFICATION_TOOL
+        
+        prompt = VERIFICATION_PROMPT.format(claim=claim, evidence=evidence)
+        fields = {}
+        announced = False
+        
+        try:
+            stream = self.stream_structured(
+                prompt, VERIFICATION_TOOL, system_prompt=VERIFICATION_SYSTEM_PROMPT, max_tokens=VERIFICATION_MAX_TOKENS
+            )
+            for kind, key, value in stream:
+                if kind == "field":
+                    fields[key] = value
+                elif kind == "delta" and key == "reasoning":
+                    # Reasoning has started, so use the default confidence if none was given
+                    fields.setdefault("confidence", 0.5)
+                
+                if not announced and "verdict" in fields and "confidence" in fields:
+                    announced = True
+                    confidence = self._clamp_confidence(fields["confidence"])
+                    yield {
+                        "type": "verdict",
+                        "verdict": self._map_verdict(fields["verdict"], confidence),
+                        "confidence": confidence
+                    }
+                
+                if kind == "delta" and key == "reasoning":
+                    yield {"type": "reasoning", "text": value}
+            
+            confidence = self._clamp_confidence(fields.get("confidence", 0.5))
+            verdict = self._map_verdict(fields.get("verdict", "Unverifiable"), confidence)
+            logger.info("Claim verification: %s (confidence: %.2f)", verdict, confidence, extra={"event": "llm.verdict"})
+            yield {
+                "type": "result",
+                "result": {
+                    "verdict": verdict,
+                    "confidence": confidence,
+                    "reasoning": fields.get("reasoning", "No reasoning provided")
+                }
+            }
+        
+        except Exception as e:
+            yield {"type": "result", "result": self._failed_verification(e)}
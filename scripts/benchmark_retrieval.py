@@ -0,0 +1,76 @@
+import sys
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from config import TOP_K_RETRIEVAL
+from models.embedder import Embedder
+from services.retriever import Retriever
+from services.store_manager import StoreManager
+from utils.logger import logger
+
+
+def make_queries(facts, count: int, seed: int = 0):
+    # Each query drops a few words from a stored fact, so its source is the known relevant result
+    rng = random.Random(seed)
+    sample = rng.sample(facts, min(count, len(facts)))
+    queries = []
+    for fact in sample:
+        words = fact['fact'].split()
+        if len(words) > 6:
+            drop = set(rng.sample(range(len(words)), len(words) // 4))
+            words = [w for i, w in enumerate(words) if i not in drop]
+        queries.append((" ".join(words), fact['id']))
+    return queries
+
+
+def run_mode(retriever: Retriever, queries, mode: str, top_k: int) -> dict:
+    latencies = []
+    hits = 0
+    for query, expected_id in queries:
+        start = time.perf_counter()
+        results = retriever.search(query, top_k=top_k, threshold=-1.0, mode=mode)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if any(r['id'] == expected_id for r in results):
+            hits += 1
+    
+    return {
+        "mode": mode,
+        f"recall@{top_k}": hits / len(queries),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "latency_ms_mean": float(np.mean(latencies))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense, lexical and hybrid retrieval")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=TOP_K_RETRIEVAL)
+    args = parser.parse_args()
+    
+    embedder = Embedder()
+    store_manager = StoreManager()
+    retriever = Retriever(embedder, store_manager)
+    
+    facts = store_manager.get_all_facts()
+    if not facts:
+        logger.error("Database is empty. Run scripts/ingest_data.py first.")
+        return
+    
+    queries = make_queries(facts, args.queries)
+    embedder.embed_query(queries[0][0])  # warm-up
+    
+    report = [run_mode(retriever, queries, mode, args.top_k) for mode in ("dense", "lexical", "hybrid")]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
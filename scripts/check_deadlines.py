@@ -0,0 +1,98 @@
+import sys
+import argparse
+import json
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models.llm_client import LLMClient, is_failed_verification
+from utils.fake_llm_server import FakeLLMServer
+from utils.logger import logger
+from utils.resilience import deadline_scope
+
+
+CLAIM = "PM Kisan provides Rs 6,000 per year to eligible farmers."
+EVIDENCE = "PM-KISAN gives eligible farmer families Rs 6,000 per year in three instalments."
+
+
+def timed(call, deadline: float):
+    started = time.monotonic()
+    with deadline_scope(deadline):
+        result = call()
+    return result, time.monotonic() - started
+
+
+def verify(llm_client: LLMClient):
+    return llm_client.verify_claim(CLAIM, EVIDENCE)
+
+
+def verify_stream(llm_client: LLMClient):
+    return [event for event in llm_client.verify_claim_stream(CLAIM, EVIDENCE)][-1]["result"]
+
+
+def check_within_deadline(name: str, server: FakeLLMServer, call, deadline: float, slack: float,
+                          expect_degraded: bool = True) -> dict:
+    # A slow API runs out of budget (degraded); an erroring one fails, but no later than the deadline
+    llm_client = LLMClient(api_key="offline-deadline-check", base_url=server.base_url)
+    requests_before = server.get_stats()["requests"]
+    result, elapsed = timed(lambda: call(llm_client), deadline)
+    return {
+        "check": name,
+        "passed": elapsed <= deadline + slack and is_failed_verification(result)
+        and bool(result.get("degraded")) == expect_degraded,
+        "deadline_s": deadline,
+        "elapsed_s": round(elapsed, 3),
+        "degraded": bool(result.get("degraded")),
+        "failed": bool(result.get("failed")),
+        "requests": server.get_stats()["requests"] - requests_before
+    }
+
+
+def check_breaker_ignores_budget(server: FakeLLMServer, calls: int, deadline: float) -> dict:
+    # Tight budgets against a healthy server must not open the breaker for everyone else
+    llm_client = LLMClient(api_key="offline-deadline-check", base_url=server.base_url)
+    for _ in range(calls):
+        timed(lambda: verify(llm_client), deadline)
+    result, elapsed = timed(lambda: verify(llm_client), 45.0)
+    breaker = llm_client.get_stats()["breaker"]
+    return {
+        "check": "breaker_ignores_budget",
+        "passed": breaker["state"] == "closed" and not is_failed_verification(result),
+        "tight_calls": calls,
+        "breaker": breaker,
+        "followup_degraded": bool(result.get("degraded")),
+        "followup_elapsed_s": round(elapsed, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that LLM calls return within the request deadline")
+    parser.add_argument("--deadline", type=float, default=1.0, help="Request deadline in seconds")
+    parser.add_argument("--slow-latency-ms", type=float, default=2500.0, help="Latency of the slow server")
+    parser.add_argument("--slack", type=float, default=0.3, help="Allowed overrun in seconds")
+    args = parser.parse_args()
+    
+    results = []
+    with FakeLLMServer(latency_median_ms=args.slow_latency_ms, latency_p99_ms=args.slow_latency_ms) as slow:
+        results.append(check_within_deadline("slow_verify_claim", slow, verify, args.deadline, args.slack))
+        results.append(check_within_deadline("slow_verify_claim_stream", slow, verify_stream, args.deadline, args.slack))
+    
+    with FakeLLMServer(latency_median_ms=50.0, latency_p99_ms=100.0, error_rate=1.0) as overloaded:
+        results.append(check_within_deadline("overloaded_verify_claim", overloaded, verify, args.deadline, args.slack,
+                                             expect_degraded=False))
+    
+    with FakeLLMServer(latency_median_ms=300.0, latency_p99_ms=300.0) as healthy:
+        results.append(check_breaker_ignores_budget(healthy, calls=12, deadline=0.1))
+    
+    print(json.dumps(results, indent=2))
+    failed = [result["check"] for result in results if not result["passed"]]
+    if failed:
+        logger.error("Deadline checks failed: %s", ", ".join(failed))
+        sys.exit(1)
+    logger.info("All %d deadline checks passed", len(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import sys
+import argparse
+import json
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+import pandas as pd
+
+from config import VERIFIED_FACTS_CSV, TOP_K_RETRIEVAL
+from models.embedder import Embedder, EMBEDDING_BACKENDS
+from utils.logger import logger
+
+
+def timed_embed(embedder: Embedder, texts):
+    start = time.perf_counter()
+    embeddings = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    return embeddings, time.perf_counter() - start
+
+
+def top_k_indices(query_embeddings: np.ndarray, corpus_embeddings: np.ndarray, k: int) -> np.ndarray:
+    scores = query_embeddings @ corpus_embeddings.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def compare_backends(reference: Embedder, candidate: Embedder, corpus, queries, top_k: int) -> dict:
+    ref_corpus, ref_corpus_time = timed_embed(reference, corpus)
+    cand_corpus, cand_corpus_time = timed_embed(candidate, corpus)
+    ref_queries, _ = timed_embed(reference, queries)
+    cand_queries, _ = timed_embed(candidate, queries)
+    
+    # Both sides are L2-normalized, so the row-wise dot product is the cosine
+    cosines = np.sum(ref_corpus * cand_corpus, axis=1)
+    
+    k = min(top_k, len(corpus))
+    ref_top = top_k_indices(ref_queries, ref_corpus, k)
+    cand_top = top_k_indices(cand_queries, cand_corpus, k)
+    overlaps = [len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)]
+    top1_agreement = float(np.mean(ref_top[:, 0] == cand_top[:, 0]))
+    
+    return {
+        "reference": reference.thread_settings(),
+        "candidate": candidate.thread_settings(),
+        "texts": len(corpus),
+        "queries": len(queries),
+        "cosine_mean": float(np.mean(cosines)),
+        "cosine_min": float(np.min(cosines)),
+        "cosine_p01": float(np.percentile(cosines, 1)),
+        f"top{k}_overlap_mean": float(np.mean(overlaps)),
+        "top1_agreement": top1_agreement,
+        "reference_texts_per_second": len(corpus) / ref_corpus_time,
+        "candidate_texts_per_second": len(corpus) / cand_corpus_time,
+        "speedup": ref_corpus_time / cand_corpus_time
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check an embedding backend against the reference torch backend")
+    parser.add_argument("--backend", required=True, choices=[b for b in EMBEDDING_BACKENDS if b != "torch"])
+    parser.add_argument("--csv", default=VERIFIED_FACTS_CSV, help="Facts CSV used as the corpus")
+    parser.add_argument("--queries", type=int, default=100, help="Number of corpus rows reused as queries")
+    parser.add_argument("--top-k", type=int, default=TOP_K_RETRIEVAL)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads for both backends")
+    args = parser.parse_args()
+    
+    corpus = pd.read_csv(args.csv, on_bad_lines='skip')['fact'].dropna().astype(str).tolist()
+    if not corpus:
+        logger.error(f"No facts found in {args.csv}")
+        return
+    
+    # Queries are truncated facts so they are similar to, but not identical with, their source row
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = [" ".join(corpus[i].split()[: max(4, len(corpus[i].split()) * 2 // 3)]) for i in sample]
+    
+    reference = Embedder(backend="torch", num_threads=args.threads)
+    candidate = Embedder(backend=args.backend, num_threads=args.threads)
+    
+    report = compare_backends(reference, candidate, corpus, queries, args.top_k)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,23 @@
 import sys
+import argparse
 from pathlib import Path
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
-from config import VERIFIED_FACTS_CSV
+from config import VERIFIED_FACTS_CSV, DEDUP_ENABLED, DEDUP_SIMILARITY_THRESHOLD
 from models.embedder import Embedder
+from services.dedup import consolidate_facts, format_report
 from services.store_manager import StoreManager
 from utils.logger import logger
 
 
-def ingest_csv_to_database(csv_path: str = None, batch_size: int = 50):
+def ingest_csv_to_database(csv_path: str = None, batch_size: int = 50, dedup: bool = None,
+                           threshold: float = None, dry_run: bool = False):
     csv_path = csv_path or VERIFIED_FACTS_CSV
     
     # Check if CSV file exists
@@ -59,44 +63,77 @@ def ingest_csv_to_database(csv_path: str = None, batch_size: int = 50):
     facts = df.to_dict('records')
     logger.info(f"Processing {len(facts)} facts...")
     
-    total_added = 0
-    for i in tqdm(range(0, len(facts), batch_size), desc="Processing batches"):
-        batch = facts[i:i+batch_size]
-        
-        fact_texts = [fact.get('fact', str(fact)) for fact in batch]
-        
+    fact_texts = [fact.get('fact', str(fact)) for fact in facts]
+    metadatas = []
+    for fact in facts:
+        metadata = {
+            "source": fact.get('source', 'unknown'),
+            "date": str(fact.get('date', '')),
+            "context": str(fact.get('context', ''))
+        }
+        metadatas.append(metadata)
+    
+    # Everything is embedded before storing, so near-duplicates are found across batches
+    kept = []
+    embedding_batches = []
+    for i in tqdm(range(0, len(facts), batch_size), desc="Embedding batches"):
         try:
-            embeddings = embedder.embed_documents(fact_texts)
+            embedding_batches.append(embedder.embed_documents(fact_texts[i:i+batch_size]))
+            kept.extend(range(i, min(i + batch_size, len(facts))))
         except Exception as e:
             logger.error(f"Error generating embeddings for batch {i//batch_size + 1}: {str(e)}")
             continue
-        
-        metadatas = []
-        for fact in batch:
-            metadata = {
-                "source": fact.get('source', 'unknown'),
-                "date": str(fact.get('date', '')),
-                "context": str(fact.get('context', ''))
-            }
-            metadatas.append(metadata)
-        
+    
+    if not kept:
+        logger.warning("No facts were embedded")
+        return
+    
+    facts = [facts[i] for i in kept]
+    metadatas = [metadatas[i] for i in kept]
+    embeddings = np.vstack(embedding_batches)
+    
+    dedup = DEDUP_ENABLED if dedup is None else dedup
+    if dedup or dry_run:
+        plan = consolidate_facts(facts, embeddings, metadatas, threshold=threshold, store_manager=store_manager)
+        print(format_report(plan["report"]))
+        if dry_run:
+            logger.info("Dry run: nothing was written")
+            return
+        facts, embeddings, metadatas = plan["facts"], plan["embeddings"], plan["metadatas"]
+        if plan["updates"]:
+            store_manager.update_metadatas(list(plan["updates"]), list(plan["updates"].values()))
+    
+    total_added = 0
+    for i in tqdm(range(0, len(facts), batch_size), desc="Storing batches"):
         try:
-            store_manager.add_facts(batch, embeddings, metadatas)
-            total_added += len(batch)
+            store_manager.add_facts(facts[i:i+batch_size], embeddings[i:i+batch_size], metadatas[i:i+batch_size])
+            total_added += len(facts[i:i+batch_size])
             logger.debug(f"Added batch {i//batch_size + 1}, total added: {total_added}")
         except Exception as e:
             logger.error(f"Error adding batch {i//batch_size + 1} to database: {str(e)}")
             continue
     
+    store_manager.flush_lexical_index()
+    
     final_count = store_manager.count()
     logger.info(f"Ingestion complete. Total facts in database: {final_count}")
     logger.info(f"Added {total_added} new facts")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Embed verified facts from a CSV and store them")
+    parser.add_argument("--csv", default=VERIFIED_FACTS_CSV)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--no-dedup", action="store_true", help="Store every row, including near-duplicates")
+    parser.add_argument("--threshold", type=float, default=DEDUP_SIMILARITY_THRESHOLD,
+                        help="Cosine similarity above which facts are merged")
+    parser.add_argument("--dry-run", action="store_true", help="Report duplicate clusters without writing")
+    args = parser.parse_args()
+    
     logger.info("Starting data ingestion")
     
-    ingest_csv_to_database()
+    ingest_csv_to_database(args.csv, batch_size=args.batch_size, dedup=False if args.no_dedup else None,
+                           threshold=args.threshold, dry_run=args.dry_run)
     
     logger.info("Data ingestion complete")
 
@@ -0,0 +1,284 @@
+import sys
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+import pandas as pd
+
+from config import VERIFIED_FACTS_CSV
+from models.llm_client import LLMClient, is_failed_verification
+from services.pipeline import FactCheckPipeline
+from utils.fake_llm_server import FakeLLMServer
+from utils.logger import logger
+
+
+SAMPLE_CLAIMS = [
+    "PM Kisan provides Rs 6,000 per year to eligible farmers.",
+    "The Indian government announced free electricity to all farmers starting July 2025.",
+    "India has the largest population in the world.",
+    "The Reserve Bank of India kept the repo rate unchanged in December 2024.",
+    "Chandrayaan-3 landed near the lunar south pole in August 2023."
+]
+
+PARAPHRASE_PREFIXES = ["Reportedly, ", "It is claimed that ", "Sources say ", "According to a post, "]
+
+
+def load_claims(csv_path: str):
+    try:
+        facts = pd.read_csv(csv_path, on_bad_lines='skip')['fact'].dropna().astype(str).tolist()
+        if facts:
+            return facts
+    except Exception as e:
+        logger.warning(f"Could not read {csv_path}, using built-in claims: {str(e)}")
+    return list(SAMPLE_CLAIMS)
+
+
+def paraphrase(claim: str, rng: random.Random) -> str:
+    words = claim.rstrip(".").split()
+    if len(words) > 4:
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    text = " ".join(words)
+    return rng.choice(PARAPHRASE_PREFIXES) + text[0].lower() + text[1:] + "."
+
+
+class ClaimMix:
+    
+    def __init__(self, claims, repeat: float, paraphrase_share: float, long_doc: float,
+                 hot_set: int = 10, long_doc_claims: int = 30, seed: int = 0):
+        self.claims = claims
+        self.hot = claims[:hot_set]
+        self.weights = [repeat, paraphrase_share, long_doc, max(0.0, 1.0 - repeat - paraphrase_share - long_doc)]
+        self.long_doc_claims = long_doc_claims
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def next(self):
+        with self._lock:
+            kind = self.rng.choices(["repeat", "paraphrase", "long_doc", "fresh"], weights=self.weights)[0]
+            if kind == "repeat":
+                return kind, self.rng.choice(self.hot)
+            if kind == "paraphrase":
+                return kind, paraphrase(self.rng.choice(self.hot), self.rng)
+            if kind == "long_doc":
+                picked = self.rng.sample(self.claims, min(self.long_doc_claims, len(self.claims)))
+                return kind, " ".join(picked)
+            return kind, self.rng.choice(self.claims)
+
+
+def rss_mb() -> float:
+    try:
+        with open(f"/proc/{os.getpid()}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    array = np.asarray(values)
+    return {
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+        "p99": float(np.percentile(array, 99)),
+        "max": float(array.max())
+    }
+
+
+class LoadGenerator:
+    
+    def __init__(self, pipeline: FactCheckPipeline, mix: ClaimMix, rate: float, concurrency: int, seed: int = 0,
+                 trace_heap: bool = False):
+        self.pipeline = pipeline
+        self.trace_heap = trace_heap
+        self.mix = mix
+        self.rate = rate
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load")
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.records = []
+        self.in_flight = 0
+    
+    def _run_one(self, kind: str, payload: str, enqueued: float):
+        started = time.perf_counter()
+        error = None
+        try:
+            if kind == "long_doc":
+                results = self.pipeline.verify_text(payload)
+            else:
+                results = [self.pipeline.verify_claim(payload)]
+            # A claim that got no LLM verdict (overload, deadline, bad response) is a failed request
+            failed = [r for r in results if is_failed_verification(r)]
+            if failed:
+                error = f"{len(failed)}/{len(results)} claims unverified: {failed[0].get('reasoning')}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        
+        with self._lock:
+            self.in_flight -= 1
+            self.records.append({
+                "kind": kind,
+                "queue_ms": (started - enqueued) * 1000,
+                "service_ms": (finished - started) * 1000,
+                "latency_ms": (finished - enqueued) * 1000,
+                "finished": finished,
+                "error": error
+            })
+    
+    def run(self, duration: float, report_interval: float):
+        if self.trace_heap:
+            tracemalloc.start()
+        start = time.perf_counter()
+        next_arrival = start
+        next_report = start + report_interval
+        memory = [self._memory_sample(0.0)]
+        submitted = 0
+        
+        # Open-loop Poisson arrivals, so a slow system builds a queue instead of slowing the generator
+        while True:
+            now = time.perf_counter()
+            if now - start >= duration:
+                break
+            
+            if now >= next_arrival:
+                kind, payload = self.mix.next()
+                with self._lock:
+                    self.in_flight += 1
+                self.executor.submit(self._run_one, kind, payload, now)
+                submitted += 1
+                next_arrival += self.rng.expovariate(self.rate)
+            
+            if now >= next_report:
+                memory.append(self._report(start, now, report_interval))
+                next_report += report_interval
+            
+            time.sleep(max(0.0, min(next_arrival, next_report) - time.perf_counter()))
+        
+        drain_started = time.perf_counter()
+        self.executor.shutdown(wait=True)
+        end = time.perf_counter()
+        memory.append(self._report(start, end, report_interval))
+        if self.trace_heap:
+            tracemalloc.stop()
+        
+        return self._summary(submitted, start, end, end - drain_started, memory)
+    
+    def _report(self, start: float, now: float, window: float):
+        with self._lock:
+            recent = [r for r in self.records if r["finished"] >= now - window]
+            in_flight = self.in_flight
+        sample = self._memory_sample(now - start)
+        
+        latency = percentiles([r["latency_ms"] for r in recent])
+        logger.info(
+            "[%5.0fs] done=%d/s in_flight=%d p50=%s p99=%s rss=%.0fMB",
+            sample["elapsed_s"], len(recent) / window, in_flight,
+            f"{latency['p50']:.0f}ms" if latency["p50"] is not None else "-",
+            f"{latency['p99']:.0f}ms" if latency["p99"] is not None else "-",
+            sample["rss_mb"]
+        )
+        return sample
+    
+    def _memory_sample(self, elapsed: float):
+        sample = {"elapsed_s": round(elapsed, 1), "rss_mb": rss_mb()}
+        # tracemalloc hooks every allocation and slows the run, so heap numbers are opt-in
+        if self.trace_heap:
+            sample["python_heap_mb"] = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        return sample
+    
+    def _summary(self, submitted: int, start: float, end: float, drain: float, memory):
+        records = self.records
+        ok = [r for r in records if r["error"] is None]
+        by_kind = {}
+        for kind in ("repeat", "paraphrase", "fresh", "long_doc"):
+            kind_records = [r["latency_ms"] for r in ok if r["kind"] == kind]
+            if kind_records:
+                by_kind[kind] = dict(percentiles(kind_records), count=len(kind_records))
+        
+        return {
+            "submitted": submitted,
+            "completed": len(records),
+            "errors": len(records) - len(ok),
+            "duration_s": end - start,
+            "drain_s": drain,
+            "throughput_per_s": len(records) / (end - start) if end > start else 0.0,
+            "latency_ms": percentiles([r["latency_ms"] for r in ok]),
+            "queue_delay_ms": percentiles([r["queue_ms"] for r in records]),
+            "service_ms": percentiles([r["service_ms"] for r in ok]),
+            "latency_by_kind_ms": by_kind,
+            "memory": {
+                "rss_start_mb": memory[0]["rss_mb"],
+                "rss_end_mb": memory[-1]["rss_mb"],
+                "rss_growth_mb": memory[-1]["rss_mb"] - memory[0]["rss_mb"],
+                "python_heap_end_mb": memory[-1].get("python_heap_mb"),
+                "samples": memory
+            },
+            "coalescing": self.pipeline.coalescing_stats()
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load and soak test for FactCheckPipeline")
+    parser.add_argument("--rate", type=float, default=5.0, help="Mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to generate load")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max concurrent pipeline calls")
+    parser.add_argument("--repeat", type=float, default=0.3, help="Share of exact repeats of hot claims")
+    parser.add_argument("--paraphrase", type=float, default=0.2, help="Share of paraphrased hot claims")
+    parser.add_argument("--long-doc", type=float, default=0.05, help="Share of long documents (verify_text)")
+    parser.add_argument("--csv", default=VERIFIED_FACTS_CSV, help="Facts CSV used as the claim pool")
+    parser.add_argument("--latency-median-ms", type=float, default=400.0)
+    parser.add_argument("--latency-p99-ms", type=float, default=2500.0)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Share of injected 529 overload errors")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="Share of injected 429 responses")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-heap", action="store_true", help="Track the Python heap with tracemalloc (slows the run)")
+    parser.add_argument("--output", help="Write the JSON summary to this file")
+    args = parser.parse_args()
+    
+    server = FakeLLMServer(
+        latency_median_ms=args.latency_median_ms,
+        latency_p99_ms=args.latency_p99_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    ).start()
+    
+    try:
+        llm_client = LLMClient(api_key="offline-load-test", base_url=server.base_url)
+        pipeline = FactCheckPipeline(llm_client=llm_client)
+        
+        mix = ClaimMix(load_claims(args.csv), args.repeat, args.paraphrase, args.long_doc, seed=args.seed)
+        generator = LoadGenerator(pipeline, mix, args.rate, args.concurrency, seed=args.seed,
+                                  trace_heap=args.trace_heap)
+        
+        logger.info("Running load test: %.1f req/s for %.0fs", args.rate, args.duration)
+        summary = generator.run(args.duration, args.report_interval)
+        summary["fake_llm_server"] = server.get_stats()
+    finally:
+        server.stop()
+    
+    output = json.dumps(summary, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
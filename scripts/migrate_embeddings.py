@@ -0,0 +1,64 @@
+import sys
+import argparse
+import json
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import EMBEDDING_MODEL, EMBEDDING_DEVICE
+from models.embedder import Embedder
+from services.embedding_migration import EmbeddingMigration, read_migration_status
+from services.store_manager import StoreManager
+from utils.logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed the active fact collection with a new model without downtime")
+    parser.add_argument("--model", default=None, help=f"Target embedding model (default: {EMBEDDING_MODEL})")
+    parser.add_argument("--device", default=EMBEDDING_DEVICE, help="Device for the target model")
+    parser.add_argument("--batch-size", type=int, default=None, help="Facts per re-embedding batch")
+    parser.add_argument("--rate", type=float, default=None, help="Maximum facts re-embedded per second")
+    parser.add_argument("--no-switch", action="store_true", help="Build the new collection but keep serving the old one")
+    parser.add_argument("--status", action="store_true", help="Show migration progress and exit")
+    args = parser.parse_args()
+    
+    if args.status:
+        # Read-only: no model load and no target collection; --model narrows the list
+        print(json.dumps(read_migration_status(model_name=args.model), indent=2))
+        return
+    
+    args.model = args.model or EMBEDDING_MODEL
+    target_embedder = Embedder(model_name=args.model, device=args.device)
+    target_dimension = target_embedder.model.get_sentence_embedding_dimension()
+    
+    # Open the store as the target version so the switch is followed by this process
+    store_manager = StoreManager(model_name=args.model, dimension=target_dimension)
+    if store_manager.version_matches(store_manager.active_version):
+        logger.info("Active collection %s already uses %s", store_manager.collection_name, args.model)
+        return
+    
+    migration = EmbeddingMigration(
+        store_manager,
+        target_embedder,
+        target_dimension=target_dimension,
+        batch_size=args.batch_size,
+        max_facts_per_second=args.rate
+    )
+    
+    logger.info(
+        "Migrating %s -> %s (%s, dim %d)",
+        migration.source.name, migration.target.name, args.model, target_dimension
+    )
+    try:
+        result = migration.run(switch=not args.no_switch)
+    except KeyboardInterrupt:
+        migration.stop()
+        logger.info("Migration interrupted; re-run to resume from offset %d", migration.progress["offset"])
+        return
+    
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import argparse
+import json
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.worker_pool import WorkerPool
+from utils.logger import logger
+
+
+def read_claims(path: str = None):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    else:
+        lines = sys.stdin.readlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify claims with a pre-forked worker pool")
+    parser.add_argument("--input", help="File with one claim per line (defaults to stdin)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    args = parser.parse_args()
+    
+    claims = read_claims(args.input)
+    if not claims:
+        logger.warning("No claims to verify")
+        return
+    
+    with WorkerPool(num_workers=args.workers) as pool:
+        results = pool.verify_claims(claims)
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+        
+        logger.info("Per-process memory (MB):")
+        for entry in pool.memory_report():
+            logger.info(
+                "  %s (pid %s): rss=%.1f pss=%.1f shared=%.1f private=%.1f",
+                entry["worker"], entry["pid"],
+                entry.get("rss_mb", 0.0), entry.get("pss_mb", 0.0),
+                entry.get("shared_clean_mb", 0.0) + entry.get("shared_dirty_mb", 0.0),
+                entry.get("private_clean_mb", 0.0) + entry.get("private_dirty_mb", 0.0)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import sys
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import SNAPSHOT_DIR, SNAPSHOT_DTYPE
+from services.snapshot import Snapshot, export_snapshot, import_snapshot
+from services.store_manager import StoreManager
+from utils.logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a portable snapshot of the fact store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Write the active collection to a snapshot")
+    export_parser.add_argument("--output", default=os.path.join(SNAPSHOT_DIR, "latest"), help="Snapshot directory")
+    export_parser.add_argument("--dtype", default=SNAPSHOT_DTYPE, choices=["float32", "float16"])
+    
+    import_parser = subparsers.add_parser("import", help="Bulk-load a snapshot without re-embedding")
+    import_parser.add_argument("--input", default=os.path.join(SNAPSHOT_DIR, "latest"), help="Snapshot directory")
+    import_parser.add_argument("--no-switch", action="store_true", help="Load the collection but keep serving the current one")
+    import_parser.add_argument("--no-verify", action="store_true", help="Skip checksum verification")
+    
+    info_parser = subparsers.add_parser("info", help="Show a snapshot manifest and verify its checksums")
+    info_parser.add_argument("--input", default=os.path.join(SNAPSHOT_DIR, "latest"), help="Snapshot directory")
+    
+    args = parser.parse_args()
+    
+    if args.command == "info":
+        snapshot = Snapshot(args.input, verify=True)
+        print(json.dumps(snapshot.manifest, indent=2))
+        return
+    
+    if args.command == "export":
+        store_manager = StoreManager()
+        if store_manager.count() == 0:
+            logger.error("Database is empty. Run scripts/ingest_data.py first.")
+            return
+        manifest = export_snapshot(store_manager, args.output, dtype=args.dtype)
+        print(json.dumps(manifest, indent=2))
+        return
+    
+    # Open the store as the snapshot's version so a fresh node needs no embedding model to bootstrap
+    snapshot = Snapshot(args.input, verify=False)
+    store_manager = StoreManager(model_name=snapshot.model, dimension=snapshot.dimension)
+    started = time.perf_counter()
+    report = import_snapshot(store_manager, args.input, switch=not args.no_switch, verify=not args.no_verify)
+    logger.info("Bootstrap finished in %.1fs, collection now holds %d facts",
+                time.perf_counter() - started, store_manager.count())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
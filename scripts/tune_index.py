@@ -0,0 +1,76 @@
+import sys
+import argparse
+import json
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import TOP_K_RETRIEVAL, VECTOR_SPACE
+from services.index_tuning import load_vectors, split_queries, tune_index, recommend
+from services.store_manager import StoreManager, hnsw_settings
+from utils.logger import logger
+
+
+def parse_ints(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep HNSW parameters for recall and latency against exact search")
+    parser.add_argument("--max-facts", type=int, default=20000, help="Sample this many stored vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors held out as queries")
+    parser.add_argument("--queries-file", help="Claims to embed as queries (one per line) instead of held-out vectors")
+    parser.add_argument("--top-k", type=int, default=TOP_K_RETRIEVAL)
+    parser.add_argument("--space", default=VECTOR_SPACE, choices=["cosine", "ip", "l2"])
+    parser.add_argument("--m", default="8,16,32")
+    parser.add_argument("--ef-construction", default="100,200")
+    parser.add_argument("--ef-search", default="10,50,100,200")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--output", help="Write all results as JSON")
+    args = parser.parse_args()
+    
+    store_manager = StoreManager()
+    vectors = load_vectors(store_manager, max_facts=args.max_facts)
+    if len(vectors) < 10:
+        logger.error("Need at least 10 stored facts to tune the index, found %d", len(vectors))
+        return
+    
+    if args.queries_file:
+        from models.embedder import Embedder
+        
+        with open(args.queries_file, "r", encoding="utf-8") as f:
+            claims = [line.strip() for line in f if line.strip()]
+        index_vectors, queries = vectors, Embedder().embed_documents(claims)
+    else:
+        index_vectors, queries = split_queries(vectors, args.queries)
+    
+    logger.info("Tuning on %d vectors with %d queries (top-%d, %s space); current index: %s",
+                len(index_vectors), len(queries), args.top_k, args.space, hnsw_settings(store_manager.collection))
+    results = tune_index(index_vectors, queries, args.top_k, args.space, parse_ints(args.m),
+                         parse_ints(args.ef_construction), parse_ints(args.ef_search))
+    
+    recall_key = f"recall@{args.top_k}"
+    print(f"{'M':>4} {'ef_c':>6} {'ef_s':>6} {recall_key:>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for r in results:
+        print(f"{r['m']:>4} {r['ef_construction']:>6} {r['ef_search']:>6} {r[recall_key]:>10.4f} "
+              f"{r['latency_ms_p50']:>8.2f} {r['latency_ms_p99']:>8.2f} {r['build_seconds']:>8.2f}")
+    
+    best = recommend(results, args.top_k, args.target_recall)
+    if best[recall_key] < args.target_recall:
+        print(f"\nNo setting reached recall {args.target_recall}; the closest is below.")
+    print("\nRecommended config.py settings:")
+    print(f'VECTOR_SPACE = "{args.space}"')
+    print(f"HNSW_M = {best['m']}")
+    print(f"HNSW_EF_CONSTRUCTION = {best['ef_construction']}")
+    print(f"HNSW_EF_SEARCH = {best['ef_search']}")
+    print("M, ef_construction and the space only apply to new collections. To rebuild the store with them, "
+          "export a snapshot, move data/chroma_db aside and import the snapshot again.")
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "recommended": best}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
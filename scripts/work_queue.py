@@ -0,0 +1,105 @@
+import sys
+import argparse
+import json
+import signal
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import WORK_QUEUE_URL
+from services.work_queue import QueueWorker, create_broker
+from utils.logger import logger
+
+
+def read_lines(path: str = None):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    else:
+        lines = sys.stdin.readlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def run_worker(broker, args):
+    from services.pipeline import FactCheckPipeline
+    
+    worker = QueueWorker(broker, FactCheckPipeline(), worker_id=args.worker_id, lease_seconds=args.lease)
+    # SIGTERM lets the current job finish before the worker exits
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run(max_jobs=args.max_jobs, exit_when_idle=args.exit_when_idle)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+def enqueue(broker, args):
+    items = read_lines(args.input)
+    if args.text:
+        items = ["\n".join(items)]
+    job_ids = [
+        broker.enqueue_text(item, method=args.method, priority=args.priority) if args.text
+        else broker.enqueue_claim(item, priority=args.priority)
+        for item in items
+    ]
+    logger.info("Enqueued %d jobs", len(job_ids))
+    for job_id in job_ids:
+        print(job_id)
+    
+    if args.wait:
+        for job_id, job in broker.wait(job_ids, timeout=args.timeout).items():
+            print(json.dumps({"id": job_id, "status": job["status"], "result": job["result"], "error": job["error"]},
+                             ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distribute fact verification through a work queue")
+    parser.add_argument("--broker", default=WORK_QUEUE_URL, help="Broker URL, e.g. sqlite:///./data/work_queue.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    worker_parser = subparsers.add_parser("worker", help="Pull and run jobs; start more of these to scale out")
+    worker_parser.add_argument("--worker-id", default=None)
+    worker_parser.add_argument("--lease", type=float, default=None, help="Lease (visibility timeout) in seconds")
+    worker_parser.add_argument("--max-jobs", type=int, default=None)
+    worker_parser.add_argument("--exit-when-idle", action="store_true")
+    
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add claims (one per line) or a document")
+    enqueue_parser.add_argument("--input", help="File to read (defaults to stdin)")
+    enqueue_parser.add_argument("--text", action="store_true", help="Treat the input as one document")
+    enqueue_parser.add_argument("--method", default="spacy", choices=["spacy", "llm"])
+    enqueue_parser.add_argument("--priority", type=int, default=0)
+    enqueue_parser.add_argument("--wait", action="store_true", help="Wait for the results and print them")
+    enqueue_parser.add_argument("--timeout", type=float, default=None)
+    
+    result_parser = subparsers.add_parser("result", help="Show a job")
+    result_parser.add_argument("job_id")
+    
+    subparsers.add_parser("stats", help="Count jobs by status")
+    subparsers.add_parser("dead-letters", help="List dead-lettered jobs")
+    
+    requeue_parser = subparsers.add_parser("requeue", help="Move a dead-lettered job back to the queue")
+    requeue_parser.add_argument("job_id")
+    
+    args = parser.parse_args()
+    broker = create_broker(args.broker)
+    
+    if args.command == "worker":
+        run_worker(broker, args)
+    elif args.command == "enqueue":
+        enqueue(broker, args)
+    elif args.command == "result":
+        print(json.dumps(broker.get(args.job_id), indent=2, ensure_ascii=False))
+    elif args.command == "stats":
+        print(json.dumps(broker.stats(), indent=2))
+    elif args.command == "dead-letters":
+        for job in broker.dead_letters():
+            print(json.dumps({"id": job["id"], "kind": job["kind"], "attempts": job["attempts"], "error": job["error"]}))
+    elif args.command == "requeue":
+        if not broker.requeue(args.job_id):
+            logger.error("Job %s is not dead-lettered", args.job_id)
+    
+    broker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from config import ANALYSIS_JOBS_DB, ANALYSIS_MAX_CONCURRENT_JOBS, ANALYSIS_JOB_RETENTION_SECONDS
+from utils.logger import logger, request_context
+from utils.sqlite_store import SQLiteStore
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+
+FINISHED_STATUSES = (JOB_DONE, JOB_CANCELLED, JOB_FAILED, JOB_INTERRUPTED)
+
+
+class AnalysisJobManager:
+    # Runs verify_text jobs for the Streamlit app on a bounded pool shared by all sessions.
+    # Progress and per-claim results are written to SQLite as they arrive, so a session
+    # can rerun, reload or come back later and pick the job up by its ID.
+    
+    def __init__(self, pipeline, db_path: str = None, max_workers: int = None, retention_seconds: float = None):
+        self.pipeline = pipeline
+        self.retention_seconds = ANALYSIS_JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self._db = SQLiteStore(db_path or ANALYSIS_JOBS_DB)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or ANALYSIS_MAX_CONCURRENT_JOBS, thread_name_prefix="analysis-job"
+        )
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._cancel_events = {}
+        
+        with self._db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT,
+                    status TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    deadline REAL,
+                    total INTEGER,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    claim TEXT NOT NULL,
+                    result TEXT,
+                    PRIMARY KEY (job_id, idx)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS analysis_jobs_owner ON analysis_jobs (owner, created_at)")
+            # Jobs run in this process only, so anything unfinished belongs to a previous run
+            now = time.time()
+            interrupted = conn.execute(
+                "UPDATE analysis_jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (JOB_INTERRUPTED, "The app restarted before this job finished", now, JOB_QUEUED, JOB_RUNNING)
+            ).rowcount
+            expired = [row["id"] for row in conn.execute(
+                "SELECT id FROM analysis_jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (now - self.retention_seconds,)
+            ).fetchall()]
+            conn.executemany("DELETE FROM analysis_results WHERE job_id = ?", [(job_id,) for job_id in expired])
+            conn.executemany("DELETE FROM analysis_jobs WHERE id = ?", [(job_id,) for job_id in expired])
+        
+        if interrupted or expired:
+            logger.info("Analysis jobs: %d marked interrupted, %d expired ones removed", interrupted, len(expired))
+    
+    def submit(self, text: str, method: str = "spacy", deadline: Optional[float] = None, owner: str = None) -> str:
+        job_id = uuid.uuid4().hex
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO analysis_jobs (id, owner, status, method, text, deadline, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, owner, JOB_QUEUED, method, text, deadline, time.time())
+            )
+        
+        cancel_event = threading.Event()
+        with self._lock:
+            self._cancel_events[job_id] = cancel_event
+            self._futures[job_id] = self._executor.submit(self._run, job_id, text, method, deadline, cancel_event)
+        logger.info("Submitted analysis job %s (%d chars, method: %s)", job_id, len(text), method)
+        return job_id
+    
+    def _run(self, job_id: str, text: str, method: str, deadline: Optional[float], cancel_event: threading.Event):
+        try:
+            if cancel_event.is_set():
+                self._finish(job_id, JOB_CANCELLED)
+                return
+            with self._db.transaction() as conn:
+                conn.execute(
+                    "UPDATE analysis_jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                    (JOB_RUNNING, time.time(), job_id, JOB_QUEUED)
+                )
+            
+            with request_context(job_id):
+                indices = {}
+                
+                def on_progress(event: Dict):
+                    if event["type"] == "claims":
+                        self._save_claims(job_id, event["claims"], indices)
+                    elif event["type"] == "result":
+                        self._save_result(job_id, event["result"], indices)
+                
+                try:
+                    results = self.pipeline.verify_text(
+                        text, extract_claims=True, method=method, deadline=deadline,
+                        progress_callback=on_progress, cancel_event=cancel_event
+                    )
+                except Exception as e:
+                    logger.error("Analysis job %s failed: %s", job_id, e)
+                    self._finish(job_id, JOB_FAILED, error=f"{type(e).__name__}: {e}")
+                    return
+                
+                self._finish(job_id, JOB_CANCELLED if cancel_event.is_set() else JOB_DONE, results=results)
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+    
+    def _save_claims(self, job_id: str, claims: List[str], indices: Dict[str, List[int]]):
+        for idx, claim in enumerate(claims):
+            indices.setdefault(claim, []).append(idx)
+        with self._db.transaction() as conn:
+            conn.execute("UPDATE analysis_jobs SET total = ? WHERE id = ?", (len(claims), job_id))
+            conn.executemany(
+                "INSERT OR REPLACE INTO analysis_results (job_id, idx, claim, result) VALUES (?, ?, ?, NULL)",
+                [(job_id, idx, claim) for idx, claim in enumerate(claims)]
+            )
+    
+    def _save_result(self, job_id: str, result: Dict, indices: Dict[str, List[int]]):
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+        with self._db.transaction() as conn:
+            for idx in indices.get(result.get("claim"), []):
+                conn.execute(
+                    "UPDATE analysis_results SET result = ? WHERE job_id = ? AND idx = ?", (payload, job_id, idx)
+                )
+            conn.execute(
+                "UPDATE analysis_jobs SET completed = "
+                "(SELECT COUNT(*) FROM analysis_results WHERE job_id = ? AND result IS NOT NULL) WHERE id = ?",
+                (job_id, job_id)
+            )
+    
+    def _finish(self, job_id: str, status: str, results: Optional[List[Dict]] = None, error: str = None):
+        with self._db.transaction() as conn:
+            if results is not None:
+                # The final list also carries the claims that were not checked in time
+                conn.execute("DELETE FROM analysis_results WHERE job_id = ?", (job_id,))
+                conn.executemany(
+                    "INSERT INTO analysis_results (job_id, idx, claim, result) VALUES (?, ?, ?, ?)",
+                    [(job_id, idx, result.get("claim", ""), json.dumps(result, ensure_ascii=False, default=str))
+                     for idx, result in enumerate(results)]
+                )
+                conn.execute(
+                    "UPDATE analysis_jobs SET total = ?, completed = ? WHERE id = ?",
+                    (len(results), sum(1 for r in results if r.get("checked") is not False), job_id)
+                )
+            conn.execute(
+                "UPDATE analysis_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+        logger.info("Analysis job %s finished: %s", job_id, status)
+    
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+            future = self._futures.get(job_id)
+        if cancel_event is None:
+            return False
+        
+        cancel_event.set()
+        # A job still waiting for a slot never starts; a running one stops after its in-flight claims
+        if future is not None and future.cancel():
+            self._finish(job_id, JOB_CANCELLED)
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+        logger.info("Cancellation requested for analysis job %s", job_id)
+        return True
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._db.connection()
+        row = conn.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        
+        job = dict(row)
+        rows = conn.execute(
+            "SELECT claim, result FROM analysis_results WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+        job["claims"] = [r["claim"] for r in rows]
+        job["results"] = [json.loads(r["result"]) if r["result"] is not None else None for r in rows]
+        job["finished"] = job["status"] in FINISHED_STATUSES
+        return job
+    
+    def list_jobs(self, owner: str = None, limit: int = 20) -> List[Dict]:
+        query = "SELECT id, owner, status, method, total, completed, error, created_at, finished_at, " \
+                "substr(text, 1, 120) AS preview FROM analysis_jobs"
+        params = []
+        if owner is not None:
+            query += " WHERE owner = ?"
+            params.append(owner)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._db.connection().execute(query, params).fetchall()]
+    
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._futures)
+    
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            cancel_events = list(self._cancel_events.values())
+        for cancel_event in cancel_events:
+            cancel_event.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._db.close()
@@ -0,0 +1,236 @@
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from config import (
+    DEDUP_SIMILARITY_THRESHOLD, DEDUP_LSH_TABLES, DEDUP_LSH_BITS, DEDUP_QUERY_BATCH_SIZE, TOP_K_RETRIEVAL
+)
+from utils.logger import logger
+
+
+SEPARATOR = "; "
+_EMPTY_VALUES = ("", "nan", "none", "unknown")
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def lsh_codes(embeddings: np.ndarray, n_tables: int = None, n_bits: int = None, seed: int = 0) -> np.ndarray:
+    # Random-hyperplane hashing: vectors at cosine s share a bit with probability
+    # 1 - arccos(s) / pi, so near-duplicates land in the same bucket in at least one table
+    n_tables = n_tables or DEDUP_LSH_TABLES
+    n_bits = n_bits or DEDUP_LSH_BITS
+    planes = np.random.default_rng(seed).standard_normal((embeddings.shape[1], n_tables * n_bits)).astype(np.float32)
+    bits = (embeddings @ planes > 0).reshape(len(embeddings), n_tables, n_bits)
+    return (bits * (1 << np.arange(n_bits, dtype=np.int64))).sum(axis=2)
+
+
+def cluster_near_duplicates(embeddings: np.ndarray, threshold: float = None,
+                            n_tables: int = None, n_bits: int = None) -> List[List[int]]:
+    # Greedy leader clustering: every member is within the threshold of its cluster's leader,
+    # so chains of slightly different paraphrases never merge unrelated facts. Only leaders
+    # sharing an LSH bucket are compared, instead of all pairs.
+    threshold = DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    embeddings = _normalize(embeddings)
+    codes = lsh_codes(embeddings, n_tables, n_bits)
+    buckets = [dict() for _ in range(codes.shape[1])]
+    clusters = {}
+    
+    for i in range(len(embeddings)):
+        candidates = set()
+        for table, code in zip(buckets, codes[i]):
+            candidates.update(table.get(code, ()))
+        
+        if candidates:
+            leaders = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarities = embeddings[leaders] @ embeddings[i]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                clusters[int(leaders[best])].append(i)
+                continue
+        
+        clusters[i] = [i]
+        for table, code in zip(buckets, codes[i]):
+            table.setdefault(code, []).append(i)
+    
+    return list(clusters.values())
+
+
+def choose_canonical(embeddings: np.ndarray, members: List[int]) -> int:
+    # The member closest to all the others represents the cluster best
+    if len(members) == 1:
+        return members[0]
+    vectors = _normalize(embeddings[members])
+    return members[int(np.argmax((vectors @ vectors.T).sum(axis=1)))]
+
+
+def _split_values(value) -> List[str]:
+    if value is None:
+        return []
+    return [part.strip() for part in str(value).split(SEPARATOR) if part.strip().lower() not in _EMPTY_VALUES]
+
+
+def row_key(fact_text: str, metadata: Dict) -> str:
+    # Identifies one source row (text, source, date), so re-ingesting it is recognised
+    identity = "\x1f".join([" ".join(str(fact_text).lower().split()),
+                             str(metadata.get("source", "")), str(metadata.get("date", ""))])
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+
+
+def merge_metadata(metadatas: List[Dict]) -> Dict:
+    # The first metadata (the canonical fact's) keeps its context; sources and dates of
+    # every copy are kept, so evidence still cites all of them
+    merged = dict(metadatas[0]) if metadatas else {}
+    for key in ("source", "date"):
+        values = []
+        for metadata in metadatas:
+            for value in _split_values(metadata.get(key)):
+                if value not in values:
+                    values.append(value)
+        if key == "date":
+            values.sort()
+        merged[key] = SEPARATOR.join(values) if values else ("unknown" if key == "source" else "")
+    
+    # duplicate_count is the number of distinct rows the fact stands for; rows stored before
+    # row keys were recorded are only known by their count
+    row_keys, untracked = [], 0
+    for metadata in metadatas:
+        keys = _split_values(metadata.get("row_keys"))
+        untracked += max(int(metadata.get("duplicate_count", len(keys) or 1)) - len(keys), 0)
+        row_keys.extend(key for key in keys if key not in row_keys)
+    if row_keys:
+        merged["row_keys"] = SEPARATOR.join(row_keys)
+    merged["duplicate_count"] = untracked + len(row_keys)
+    return merged
+
+
+def _top_k_waste(sizes: np.ndarray) -> float:
+    # Share of a top-k window a query matching one of these facts would spend on its paraphrases
+    if not len(sizes):
+        return 0.0
+    return float(np.mean(np.minimum(np.repeat(sizes, sizes) - 1, TOP_K_RETRIEVAL)) / TOP_K_RETRIEVAL)
+
+
+def find_existing_duplicates(store_manager, embeddings: np.ndarray, threshold: float = None,
+                             batch_size: int = None) -> List[Optional[Tuple[str, Dict]]]:
+    # The collection's own ANN index finds each vector's nearest stored fact; the cosine
+    # is computed from the returned embedding, whatever distance the collection uses
+    threshold = DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    batch_size = batch_size or DEDUP_QUERY_BATCH_SIZE
+    embeddings = _normalize(embeddings)
+    matches = [None] * len(embeddings)
+    # Another process may have switched collections (migration, snapshot import) since startup
+    store_manager.refresh_active_collection()
+    if len(embeddings) == 0 or store_manager.count() == 0:
+        return matches
+    
+    for start in range(0, len(embeddings), batch_size):
+        batch = embeddings[start:start + batch_size]
+        results = store_manager.collection.query(
+            query_embeddings=batch.tolist(),
+            n_results=1,
+            include=["embeddings", "metadatas"]
+        )
+        for offset, (ids, neighbours, metadatas) in enumerate(
+                zip(results["ids"], results["embeddings"], results["metadatas"])):
+            if not ids:
+                continue
+            neighbour = _normalize(np.asarray(neighbours[:1]))[0]
+            if float(neighbour @ batch[offset]) >= threshold:
+                matches[start + offset] = (ids[0], metadatas[0] or {})
+    return matches
+
+
+def consolidate_facts(facts: List[Dict], embeddings: np.ndarray, metadatas: List[Dict],
+                      threshold: float = None, store_manager=None) -> Dict:
+    # Returns the canonical facts to add, the stored facts whose metadata absorbs new
+    # copies, and a report. Nothing is written; the caller decides (or dry-runs).
+    threshold = DEDUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    metadatas = [dict(metadata, row_keys=row_key(_fact_text(fact), metadata))
+                 for fact, metadata in zip(facts, metadatas)]
+    clusters = cluster_near_duplicates(embeddings, threshold)
+    canonicals = [choose_canonical(embeddings, members) for members in clusters]
+    
+    existing = [None] * len(clusters)
+    if store_manager is not None:
+        existing = find_existing_duplicates(store_manager, embeddings[canonicals], threshold)
+    
+    add_indices, add_metadatas = [], []
+    updates = {}
+    already_stored = 0
+    for members, canonical, match in zip(clusters, canonicals, existing):
+        ordered = [canonical] + [i for i in members if i != canonical]
+        if match is None:
+            add_indices.append(canonical)
+            add_metadatas.append(merge_metadata([metadatas[i] for i in ordered]))
+        else:
+            fact_id, stored = match
+            base = updates.get(fact_id, stored)
+            # Rows the stored fact already stands for (a re-ingest of the same file) change nothing
+            stored_keys = set(_split_values(base.get("row_keys")))
+            new_rows = [i for i in ordered if metadatas[i]["row_keys"] not in stored_keys]
+            already_stored += len(ordered) - len(new_rows)
+            if new_rows:
+                updates[fact_id] = merge_metadata([base] + [metadatas[i] for i in new_rows])
+    
+    sizes = np.array([len(members) for members in clusters], dtype=np.int64)
+    # Greedy clustering can leave two canonicals within the threshold of each other; those
+    # are the copies still competing for top-k slots once the plan is applied
+    remaining = cluster_near_duplicates(embeddings[add_indices], threshold) if add_indices else []
+    remaining_sizes = np.array([len(members) for members in remaining], dtype=np.int64)
+    largest = sorted(range(len(clusters)), key=lambda c: -sizes[c])[:5]
+    report = {
+        "threshold": threshold,
+        "input_facts": len(facts),
+        "clusters": len(clusters),
+        "duplicate_clusters": int((sizes > 1).sum()),
+        "duplicates_removed": int(len(facts) - len(clusters)),
+        "merged_into_existing": len(updates),
+        "already_stored": already_stored,
+        "facts_to_add": len(add_indices),
+        "size_histogram": {int(size): int((sizes == size).sum()) for size in np.unique(sizes)},
+        "top_k_waste_before": _top_k_waste(sizes),
+        "top_k_waste_after": _top_k_waste(remaining_sizes),
+        "largest_clusters": [
+            {"size": int(sizes[c]), "canonical": _fact_text(facts[canonicals[c]]),
+             "members": [_fact_text(facts[i]) for i in clusters[c] if i != canonicals[c]][:3]}
+            for c in largest if sizes[c] > 1
+        ]
+    }
+    logger.info("Deduplication: %d facts -> %d clusters (%d duplicates, %d merged into stored facts)",
+                report["input_facts"], report["clusters"], report["duplicates_removed"], report["merged_into_existing"])
+    
+    return {
+        "facts": [facts[i] for i in add_indices],
+        "embeddings": embeddings[add_indices] if add_indices else embeddings[:0],
+        "metadatas": add_metadatas,
+        "updates": updates,
+        "report": report
+    }
+
+
+def _fact_text(fact: Dict) -> str:
+    return str(fact.get('fact', fact.get('text', fact)))
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"Similarity threshold:   {report['threshold']}",
+        f"Input facts:            {report['input_facts']}",
+        f"Clusters:               {report['clusters']} ({report['duplicate_clusters']} with duplicates)",
+        f"Duplicates removed:     {report['duplicates_removed']}",
+        f"Merged into stored:     {report['merged_into_existing']}",
+        f"Already stored rows:    {report['already_stored']}",
+        f"Facts to add:           {report['facts_to_add']}",
+        f"Top-k slots on copies:  {report['top_k_waste_before']:.1%} before, "
+        f"{report['top_k_waste_after']:.1%} after consolidation (within this batch)",
+        "Cluster sizes:          " + ", ".join(f"{size}: {count}" for size, count in report["size_histogram"].items())
+    ]
+    for cluster in report["largest_clusters"]:
+        lines.append(f"\n[{cluster['size']}] {cluster['canonical']}")
+        lines.extend(f"    ~ {member}" for member in cluster["members"])
+    return "\n".join(lines)
@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import CHROMA_DB_PATH, MIGRATION_BATCH_SIZE, MIGRATION_MAX_FACTS_PER_SECOND
+from models.embedder import Embedder
+from services.store_manager import StoreManager
+from utils.logger import logger
+
+
+def _with_percent(progress: Dict) -> Dict:
+    status = dict(progress)
+    total = status.get("total") or 0
+    status["percent"] = round(100.0 * status.get("copied", 0) / total, 1) if total else 100.0
+    return status
+
+
+def read_migration_status(persist_directory: str = None, model_name: str = None) -> List[Dict]:
+    # Read-only: only the progress files, no model load and no collection created
+    statuses = []
+    pattern = os.path.join(persist_directory or CHROMA_DB_PATH, "migration_*.json")
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read migration progress %s: %s", path, e)
+            continue
+        if model_name is None or progress.get("model") == model_name:
+            statuses.append(_with_percent(progress))
+    return statuses
+
+
+class EmbeddingMigration:
+    
+    def __init__(
+        self,
+        store_manager: StoreManager,
+        target_embedder: Embedder,
+        target_dimension: Optional[int] = None,
+        batch_size: int = None,
+        max_facts_per_second: float = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ):
+        self.store_manager = store_manager
+        self.target_embedder = target_embedder
+        self.target_model = target_embedder.model_name
+        self.target_dimension = target_dimension or target_embedder.model.get_sentence_embedding_dimension()
+        self.batch_size = batch_size or MIGRATION_BATCH_SIZE
+        self.max_facts_per_second = max_facts_per_second or MIGRATION_MAX_FACTS_PER_SECOND
+        self.progress_callback = progress_callback
+        
+        self.source = store_manager.collection
+        self.target = store_manager.get_or_create_versioned_collection(
+            self.target_model, self.target_dimension, status="migrating"
+        )
+        if self.target.name == self.source.name:
+            raise ValueError(f"Collection {self.source.name} is already built with {self.target_model}")
+        
+        self.progress_path = os.path.join(
+            store_manager.persist_directory, f"migration_{self.target.name}.json"
+        )
+        self.progress = self._load_progress()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _load_progress(self) -> Dict:
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            if progress.get("source") == self.source.name:
+                logger.info("Resuming migration into %s at offset %d", self.target.name, progress["offset"])
+                return progress
+        except (OSError, ValueError):
+            pass
+        
+        return {
+            "source": self.source.name,
+            "target": self.target.name,
+            "model": self.target_model,
+            "dimension": self.target_dimension,
+            "offset": 0,
+            "copied": 0,
+            "total": self.source.count(),
+            "status": "pending",
+            "started_at": time.time(),
+            "updated_at": time.time()
+        }
+    
+    def _save_progress(self, **updates):
+        self.progress.update(updates, updated_at=time.time())
+        tmp_path = self.progress_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f)
+        os.replace(tmp_path, self.progress_path)
+        
+        if self.progress_callback:
+            self.progress_callback(dict(self.progress))
+    
+    def _copy(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        embeddings = self.target_embedder.embed_documents(documents)
+        self.target.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+    
+    def _throttle(self, batch_started: float, batch_len: int):
+        min_duration = batch_len / self.max_facts_per_second
+        elapsed = time.monotonic() - batch_started
+        if elapsed < min_duration:
+            self._stop.wait(min_duration - elapsed)
+    
+    def _backfill(self):
+        self._save_progress(status="copying", total=self.source.count())
+        
+        while not self._stop.is_set():
+            batch_started = time.monotonic()
+            batch = self.source.get(
+                offset=self.progress["offset"],
+                limit=self.batch_size,
+                include=["documents", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+            
+            self._copy(batch["ids"], batch["documents"], batch["metadatas"])
+            self._save_progress(
+                offset=self.progress["offset"] + len(batch["ids"]),
+                copied=self.progress["copied"] + len(batch["ids"])
+            )
+            logger.info("Migration progress: %d/%d facts", self.progress["copied"], self.progress["total"])
+            self._throttle(batch_started, len(batch["ids"]))
+    
+    def _catch_up(self):
+        # Pick up facts added or deleted in the source while the backfill ran
+        source_ids = set(self.source.get(include=[])["ids"])
+        target_ids = set(self.target.get(include=[])["ids"])
+        
+        missing = sorted(source_ids - target_ids)
+        for i in range(0, len(missing), self.batch_size):
+            batch = self.source.get(ids=missing[i:i + self.batch_size], include=["documents", "metadatas"])
+            if batch["ids"]:
+                self._copy(batch["ids"], batch["documents"], batch["metadatas"])
+        
+        removed = sorted(target_ids - source_ids)
+        if removed:
+            self.target.delete(ids=removed)
+        
+        logger.info("Migration catch-up: %d added, %d removed", len(missing), len(removed))
+    
+    def run(self, switch: bool = True) -> Dict:
+        try:
+            self._backfill()
+            if self._stop.is_set():
+                self._save_progress(status="paused")
+                logger.info("Migration paused at offset %d", self.progress["offset"])
+                return dict(self.progress)
+            
+            self._catch_up()
+            self.store_manager.set_collection_status(self.target, "ready")
+            
+            if switch:
+                self.store_manager.switch_active_collection(self.target.name, self.target_model, self.target_dimension)
+                self._save_progress(status="switched", total=self.target.count())
+            else:
+                self._save_progress(status="ready", total=self.target.count())
+            
+            logger.info("Migration into %s finished: %s", self.target.name, self.progress["status"])
+            return dict(self.progress)
+        
+        except Exception as e:
+            logger.error(f"Error during embedding migration: {str(e)}")
+            self._save_progress(status="failed", error=str(e))
+            raise
+    
+    def start(self, switch: bool = True) -> threading.Thread:
+        self._thread = threading.Thread(target=self.run, kwargs={"switch": switch}, name="embedding-migration", daemon=True)
+        self._thread.start()
+        return self._thread
+    
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+    
+    def status(self) -> Dict:
+        return _with_percent(self.progress)
@@ -0,0 +1,108 @@
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import INCREMENTAL_CACHE_MAX_CHUNKS, INCREMENTAL_CACHE_MAX_RESULTS, INCREMENTAL_RESULT_TTL_SECONDS
+from models.llm_client import is_failed_verification
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def split_document(text: str) -> List[str]:
+    # Claims are cached per paragraph for both methods: extraction sees the same context
+    # it would for the whole document (spaCy's own sentence boundaries, which a regex
+    # cannot match around abbreviations), and an edit only invalidates its paragraph
+    return [paragraph.strip() for paragraph in re.split(r'\n\s*\n', text) if paragraph.strip()]
+
+
+def chunk_key(chunk: str, method: str) -> str:
+    return hashlib.sha256(f"{method}\0{normalize_text(chunk)}".encode("utf-8")).hexdigest()
+
+
+class _LRU:
+    
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class IncrementalCache:
+    # Claims per chunk content hash, and verification results per normalized claim.
+    # Results are scoped to the collection that produced them and expire after a TTL,
+    # so newly ingested facts are picked up.
+    
+    def __init__(self, max_chunks: int = None, max_results: int = None, result_ttl: float = None):
+        self.chunks = _LRU(max_chunks or INCREMENTAL_CACHE_MAX_CHUNKS)
+        self.results = _LRU(max_results or INCREMENTAL_CACHE_MAX_RESULTS)
+        self.result_ttl = INCREMENTAL_RESULT_TTL_SECONDS if result_ttl is None else result_ttl
+        self._stats_lock = threading.Lock()
+        self.stats = {"chunk_hits": 0, "chunk_misses": 0, "result_hits": 0, "result_misses": 0}
+    
+    def _count(self, key: str, delta: int = 1):
+        with self._stats_lock:
+            self.stats[key] += delta
+    
+    def get_claims(self, key: str) -> Optional[List[str]]:
+        claims = self.chunks.get(key)
+        self._count("chunk_hits" if claims is not None else "chunk_misses")
+        return claims
+    
+    def put_claims(self, key: str, claims: List[str]):
+        self.chunks.put(key, list(claims))
+    
+    @staticmethod
+    def result_key(claim: str, scope: str) -> Tuple[str, str]:
+        return (normalize_text(claim).lower(), scope)
+    
+    def get_result(self, claim: str, scope: str) -> Optional[Dict]:
+        entry = self.results.get(self.result_key(claim, scope))
+        if entry is not None and time.monotonic() - entry[0] <= self.result_ttl:
+            self._count("result_hits")
+            return copy.deepcopy(entry[1])
+        self._count("result_misses")
+        return None
+    
+    def put_result(self, claim: str, scope: str, result: Dict):
+        # Degraded and failed verifications are worth retrying, so they are not kept
+        if is_failed_verification(result):
+            return
+        self.results.put(self.result_key(claim, scope), (time.monotonic(), copy.deepcopy(result)))
+    
+    def clear(self):
+        self.chunks.clear()
+        self.results.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["chunks_cached"] = len(self.chunks)
+        stats["results_cached"] = len(self.results)
+        return stats
@@ -0,0 +1,118 @@
+import itertools
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+from services.store_manager import hnsw_metadata
+from utils.logger import logger
+
+
+def load_vectors(store_manager, max_facts: int = None, batch_size: int = 5000, seed: int = 0) -> np.ndarray:
+    total = store_manager.count()
+    chunks = []
+    for offset in range(0, total, batch_size):
+        batch = store_manager.collection.get(include=["embeddings"], limit=batch_size, offset=offset)
+        chunks.append(np.asarray(batch["embeddings"], dtype=np.float32))
+    if not chunks:
+        return np.zeros((0, store_manager.expected_dimension), dtype=np.float32)
+    
+    vectors = np.vstack(chunks)
+    if max_facts is not None and len(vectors) > max_facts:
+        vectors = vectors[np.random.default_rng(seed).choice(len(vectors), max_facts, replace=False)]
+    return vectors
+
+
+def split_queries(vectors: np.ndarray, count: int, seed: int = 0):
+    # Held-out stored vectors are realistic queries whose exact neighbours are known
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    count = min(count, len(vectors) // 5)
+    return vectors[order[count:]], vectors[order[:count]]
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def exact_top_k(index_vectors: np.ndarray, queries: np.ndarray, k: int, space: str = "cosine",
+                batch_size: int = 256) -> np.ndarray:
+    # Brute-force ground truth in the same space the index ranks by
+    if space == "cosine":
+        index_vectors, queries = _unit(index_vectors), _unit(queries)
+    truth = []
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        if space == "l2":
+            scores = -((batch ** 2).sum(axis=1)[:, None] - 2 * batch @ index_vectors.T + (index_vectors ** 2).sum(axis=1)[None, :])
+        else:
+            scores = batch @ index_vectors.T
+        top = np.argpartition(-scores, min(k, scores.shape[1] - 1), axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        truth.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(truth)
+
+
+def build_index(client, name: str, vectors: np.ndarray, space: str, m: int, ef_construction: int,
+                ef_search: int, batch_size: int = None):
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(space, m, ef_construction, ef_search))
+    batch_size = batch_size or (client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000)
+    started = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        end = min(start + batch_size, len(vectors))
+        collection.add(ids=[str(i) for i in range(start, end)], embeddings=vectors[start:end].tolist())
+    return collection, time.perf_counter() - started
+
+
+def evaluate(collection, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(set(int(i) for i in result["ids"][0]) & set(int(i) for i in expected))
+    return {
+        f"recall@{k}": hits / truth.size if truth.size else 0.0,
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p99": float(np.percentile(latencies, 99))
+    }
+
+
+def tune_index(index_vectors: np.ndarray, queries: np.ndarray, k: int, space: str,
+               m_values: Sequence[int], ef_construction_values: Sequence[int],
+               ef_search_values: Sequence[int]) -> List[Dict]:
+    # Every combination gets its own index: Chroma applies a changed ef_search only when
+    # an index is loaded, not to one a process has already queried
+    truth = exact_top_k(index_vectors, queries, k, space)
+    workdir = tempfile.mkdtemp(prefix="index_tuning_")
+    client = chromadb.PersistentClient(path=workdir, settings=Settings(anonymized_telemetry=False))
+    results = []
+    
+    try:
+        for m, ef_construction, ef_search in itertools.product(m_values, ef_construction_values, ef_search_values):
+            name = f"tune_m{m}_efc{ef_construction}_efs{ef_search}"
+            collection, build_seconds = build_index(client, name, index_vectors, space, m, ef_construction, ef_search)
+            metrics = evaluate(collection, queries, truth, k)
+            results.append(dict({"m": m, "ef_construction": ef_construction, "ef_search": ef_search,
+                                 "build_seconds": build_seconds}, **metrics))
+            logger.info("M=%d ef_construction=%d ef_search=%d: built in %.1fs, %s",
+                        m, ef_construction, ef_search, build_seconds, metrics)
+            client.delete_collection(name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def recommend(results: List[Dict], k: int, target_recall: float) -> Optional[Dict]:
+    # The fastest setting that meets the recall target, cheaper builds breaking ties;
+    # if none does, the one with the best recall
+    if not results:
+        return None
+    recall_key = f"recall@{k}"
+    meeting = [r for r in results if r[recall_key] >= target_recall]
+    if meeting:
+        return min(meeting, key=lambda r: (r["latency_ms_p99"], r["build_seconds"]))
+    return max(results, key=lambda r: (r[recall_key], -r["latency_ms_p99"]))
@@ -0,0 +1,276 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import BM25_K1, BM25_B
+from utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,:/-][0-9]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    # Numbers such as "6,000", "3.5" and "2024-12-20" stay single tokens
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+@contextmanager
+def _file_lock(path: str):
+    # Serialises writers of one index file across processes; readers never take it
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "a+b") as f:
+        f.seek(0)
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_signature(path: Optional[str]):
+    # save() replaces the file, so a new inode or mtime means another process wrote it
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class LexicalIndex:
+    # One index file per collection, shared by every process using it. Local changes are
+    # kept as pending operations and replayed onto the latest file when saving, so
+    # processes pick up each other's writes instead of overwriting them.
+    
+    def __init__(self, path: Optional[str] = None, k1: float = None, b: float = None):
+        self.path = path
+        self.k1 = k1 or BM25_K1
+        self.b = b or BM25_B
+        
+        self._lock = threading.RLock()
+        self.doc_ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.id_to_index: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.deleted = set()
+        self.total_length = 0
+        self.dirty = False
+        self._pending: List[Tuple[str, List[str], Optional[List[str]]]] = []
+        self._file_state = None
+        
+        if path and os.path.exists(path):
+            self.load(path)
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids) - len(self.deleted)
+    
+    def add(self, ids: List[str], documents: List[str]):
+        with self._lock:
+            ids, documents = list(ids), list(documents)
+            self._apply_add(ids, documents)
+            self._pending.append(("add", ids, documents))
+            self.dirty = True
+    
+    def _apply_add(self, ids: List[str], documents: List[str]):
+        for doc_id, document in zip(ids, documents):
+            if doc_id in self.id_to_index:
+                self._remove(doc_id)
+            
+            tokens = tokenize(document)
+            doc_index = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.doc_lengths.append(len(tokens))
+            self.id_to_index[doc_id] = doc_index
+            self.total_length += len(tokens)
+            
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[doc_index] = tf
+    
+    def _remove(self, doc_id: str):
+        doc_index = self.id_to_index.pop(doc_id, None)
+        if doc_index is None:
+            return
+        # Tombstoned here; the posting entries are dropped when the index is compacted on save
+        self.deleted.add(doc_index)
+        self.total_length -= self.doc_lengths[doc_index]
+    
+    def delete(self, ids: List[str]):
+        with self._lock:
+            ids = list(ids)
+            for doc_id in ids:
+                self._remove(doc_id)
+            self._pending.append(("delete", ids, None))
+            self.dirty = True
+    
+    def refresh(self):
+        # Reloads the file if another process saved it, keeping this process's unsaved changes
+        if not self.path:
+            return
+        with self._lock:
+            if _file_signature(self.path) == self._file_state:
+                return
+            if not os.path.exists(self.path):
+                return
+            self.load(self.path)
+            for operation, ids, documents in self._pending:
+                if operation == "add":
+                    self._apply_add(ids, documents)
+                else:
+                    for doc_id in ids:
+                        self._remove(doc_id)
+            self.dirty = bool(self._pending)
+    
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float, float]]:
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+        
+        self.refresh()
+        with self._lock:
+            live_docs = len(self)
+            if live_docs == 0:
+                return []
+            avg_length = self.total_length / live_docs
+            
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for term in query_terms:
+                # Tombstoned documents count neither towards df nor the results
+                posting = [(i, tf) for i, tf in self.postings.get(term, {}).items() if i not in self.deleted]
+                if not posting:
+                    continue
+                
+                df = len(posting)
+                idf = math.log(1.0 + (live_docs - df + 0.5) / (df + 0.5))
+                for doc_index, tf in posting:
+                    norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_index] / avg_length)
+                    scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+                    matched[doc_index] = matched.get(doc_index, 0) + 1
+            
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            # Coverage is the share of query terms found in the document
+            return [
+                (self.doc_ids[doc_index], score, matched[doc_index] / len(query_terms))
+                for doc_index, score in ranked
+            ]
+    
+    def _compact(self):
+        if not self.deleted:
+            return
+        
+        remap = {}
+        doc_ids, doc_lengths = [], []
+        for old_index, doc_id in enumerate(self.doc_ids):
+            if old_index in self.deleted:
+                continue
+            remap[old_index] = len(doc_ids)
+            doc_ids.append(doc_id)
+            doc_lengths.append(self.doc_lengths[old_index])
+        
+        postings = {}
+        for term, posting in self.postings.items():
+            kept = {remap[i]: tf for i, tf in posting.items() if i in remap}
+            if kept:
+                postings[term] = kept
+        
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.id_to_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        self.postings = postings
+        self.deleted = set()
+    
+    def save(self, path: Optional[str] = None, merge: bool = True):
+        # merge=False writes this index as is, replacing the file (a rebuild from the collection)
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for the lexical index")
+        
+        with self._lock, _file_lock(path):
+            if merge and path == self.path:
+                self.refresh()
+            self._compact()
+            
+            terms = sorted(self.postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            doc_gaps, tfs = [], []
+            for i, term in enumerate(terms):
+                posting = sorted(self.postings[term].items())
+                # Posting lists are stored as gaps between sorted doc numbers
+                previous = 0
+                for doc_index, tf in posting:
+                    doc_gaps.append(doc_index - previous)
+                    tfs.append(min(tf, 65535))
+                    previous = doc_index
+                offsets[i + 1] = len(doc_gaps)
+            
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(
+                tmp_path,
+                terms=np.array(terms, dtype=object).astype(str),
+                offsets=offsets,
+                doc_gaps=np.array(doc_gaps, dtype=np.uint32),
+                tfs=np.array(tfs, dtype=np.uint16),
+                doc_ids=np.array(self.doc_ids, dtype=object).astype(str),
+                doc_lengths=np.array(self.doc_lengths, dtype=np.uint32),
+                params=np.array([self.k1, self.b], dtype=np.float64)
+            )
+            os.replace(tmp_path, path)
+            if path == self.path:
+                self._file_state = _file_signature(path)
+                self._pending = []
+            self.dirty = False
+        
+        logger.info("Saved lexical index with %d documents and %d terms to %s", len(self), len(terms), path)
+    
+    def load(self, path: str):
+        file_state = _file_signature(path)
+        with np.load(path, allow_pickle=False) as data:
+            terms = data["terms"].tolist()
+            offsets = data["offsets"]
+            doc_gaps = data["doc_gaps"]
+            tfs = data["tfs"]
+            doc_ids = data["doc_ids"].tolist()
+            doc_lengths = data["doc_lengths"].tolist()
+        
+        postings = {}
+        for i, term in enumerate(terms):
+            start, end = offsets[i], offsets[i + 1]
+            doc_indices = np.cumsum(doc_gaps[start:end]).tolist()
+            postings[term] = dict(zip(doc_indices, tfs[start:end].tolist()))
+        
+        with self._lock:
+            self.doc_ids = doc_ids
+            self.doc_lengths = doc_lengths
+            self.id_to_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+            self.postings = postings
+            self.deleted = set()
+            self.total_length = sum(doc_lengths)
+            self.dirty = False
+            if path == self.path:
+                self._file_state = file_state
+        
+        logger.info("Loaded lexical index with %d documents from %s", len(doc_ids), path)
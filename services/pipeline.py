@@ -1,10 +1,21 @@
-from typing import List, Dict, Optional
+import contextvars
+import copy
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Callable, Iterator, List, Dict, Optional
+from config import (
+    REQUEST_DEADLINE_SECONDS, CLAIM_EXTRACTION_MAX_WORKERS, VERIFY_TEXT_DEADLINE_SECONDS, VERIFY_TEXT_MAX_WORKERS
+)
 from models.claim_extractor import ClaimExtractor
 from models.embedder import Embedder
 from models.llm_client import LLMClient
+from services.incremental import IncrementalCache, chunk_key, normalize_text, split_document
 from services.retriever import Retriever
 from services.store_manager import StoreManager
-from utils.logger import logger
+from utils.logger import logger, request_context
+from utils.resilience import deadline_scope
+from utils.single_flight import SingleFlight
 
 
 class FactCheckPipeline:
@@ -22,57 +33,183 @@ class FactCheckPipeline:
         self.store_manager = store_manager or StoreManager()
         
         self.retriever = Retriever(self.embedder, self.store_manager)
+        self.single_flight = SingleFlight()
+        self.incremental_cache = IncrementalCache()
         
         logger.info("FactCheckPipeline initialized successfully")
     
     def extract_claims(self, text: str, method: str = "spacy") -> List[str]:
-        logger.info(f"Extracting claims using method: {method}")
+        logger.info("Extracting claims using method: %s", method)
         
         if method == "llm":
-            return self.claim_extractor.extract_claims_llm(text, self.llm_client)
+            return self.claim_extractor.extract_claims_llm(text, self.llm_client, embedder=self.embedder)
         else:
             return self.claim_extractor.extract_claims(text)
     
-    def verify_claim(self, claim: str, evidence: Optional[str] = None) -> Dict:
-        logger.info(f"Verifying claim: {claim[:100]}...")
-        
-        if evidence is None:
-            relevant_facts = self.retriever.search_and_rerank(
-                claim,
-                llm_client=self.llm_client
+    @staticmethod
+    def _claim_key(claim: str, evidence: Optional[str] = None):
+        return (" ".join(claim.lower().split()), evidence)
+    
+    def verify_claim(self, claim: str, evidence: Optional[str] = None, deadline: Optional[float] = None) -> Dict:
+        with request_context(), deadline_scope(deadline or REQUEST_DEADLINE_SECONDS):
+            # Identical claims already in flight wait for that result instead of recomputing
+            result = self.single_flight.do(
+                self._claim_key(claim, evidence),
+                lambda: self._verify_claim(claim, evidence)
             )
-            
-            if not relevant_facts:
-                logger.warning("No relevant evidence found in database")
-                return {
-                    "claim": claim,
-                    "verdict": "Unverifiable",
-                    "confidence": 0.0,
-                    "evidence": [],
-                    "reasoning": "No relevant evidence found in database. Cannot verify this claim with available information."
-                }
-            
-            evidence_list = [fact['text'] for fact in relevant_facts[:3]]
-            
-            evidence_text = "\n\n".join([
-                f"Evidence {i+1}:\n{fact['text']}\nSource: {fact['metadata'].get('source', 'unknown')}\nDate: {fact['metadata'].get('date', 'unknown')}"
-                for i, fact in enumerate(relevant_facts[:3])
-            ])
-            
-            logger.info(f"Retrieved {len(relevant_facts)} relevant facts")
-        else:
-            evidence_text = evidence
-            evidence_list = [evidence]
+            result["claim"] = claim
+            return result
+    
+    async def averify_claim(self, claim: str, evidence: Optional[str] = None, deadline: Optional[float] = None) -> Dict:
+        with request_context(), deadline_scope(deadline or REQUEST_DEADLINE_SECONDS):
+            result = await self.single_flight.do_async(
+                self._claim_key(claim, evidence),
+                lambda: self._verify_claim(claim, evidence)
+            )
+            result["claim"] = claim
+            return result
+    
+    def coalescing_stats(self) -> Dict:
+        return self.single_flight.get_stats()
+    
+    def llm_stats(self) -> Dict:
+        return self.llm_client.get_stats()
+    
+    def _gather_evidence(self, claim: str, evidence: Optional[str] = None):
+        if evidence is not None:
+            return evidence, [evidence]
+        
+        relevant_facts = self.retriever.search_and_rerank(
+            claim,
+            llm_client=self.llm_client
+        )
+        
+        if not relevant_facts:
+            return None, []
+        
+        evidence_list = [fact['text'] for fact in relevant_facts[:3]]
+        
+        evidence_text = "\n\n".join([
+            f"Evidence {i+1}:\n{fact['text']}\nSource: {fact['metadata'].get('source', 'unknown')}\nDate: {fact['metadata'].get('date', 'unknown')}"
+            for i, fact in enumerate(relevant_facts[:3])
+        ])
+        
+        logger.info("Retrieved %d relevant facts", len(relevant_facts), extra={"event": "pipeline.evidence"})
+        return evidence_text, evidence_list
+    
+    @staticmethod
+    def _no_evidence_result(claim: str) -> Dict:
+        logger.warning("No relevant evidence found in database")
+        return {
+            "claim": claim,
+            "verdict": "Unverifiable",
+            "confidence": 0.0,
+            "evidence": [],
+            "reasoning": "No relevant evidence found in database. Cannot verify this claim with available information."
+        }
+    
+    def _verify_claim(self, claim: str, evidence: Optional[str] = None) -> Dict:
+        logger.info("Verifying claim: %.100s...", claim, extra={"event": "pipeline.claim"})
+        
+        evidence_text, evidence_list = self._gather_evidence(claim, evidence)
+        if evidence_text is None:
+            return self._no_evidence_result(claim)
         
         result = self.llm_client.verify_claim(claim, evidence_text)
         
         result["claim"] = claim
         result["evidence"] = evidence_list
         
-        logger.info(f"Verification complete: {result['verdict']} (confidence: {result.get('confidence', 0):.2f})")
+        logger.info("Verification complete: %s (confidence: %.2f)", result['verdict'], result.get('confidence', 0),
+                    extra={"event": "pipeline.verdict"})
         return result
     
-    def verify_text(self, text: str, extract_claims: bool = True, method: str = "spacy") -> List[Dict]:
+    def verify_claim_stream(self, claim: str, evidence: Optional[str] = None,
+                            deadline: Optional[float] = None) -> Iterator[Dict]:
+        # Same result as verify_claim, delivered as events: "evidence", "verdict", "reasoning"
+        # pieces and a final "result". A stream leads the single-flight group for its claim, so
+        # identical claims (streamed or not) arriving meanwhile wait for its final result; a
+        # stream that joins a group gets only that final "result" event, without partial events.
+        key = self._claim_key(claim, evidence)
+        future, leader = self.single_flight.join(key)
+        if not leader:
+            logger.info("Waiting for the in-flight verification of: %.100s...", claim, extra={"event": "pipeline.claim"})
+            result = copy.deepcopy(future.result())
+            result["claim"] = claim
+            yield {"type": "result", "result": result}
+            return
+        
+        # The request ID and deadline live in a context of their own that each step runs in,
+        # so nothing stays set in the consumer's context between events.
+        context = contextvars.copy_context()
+        scopes = ExitStack()
+        context.run(scopes.enter_context, request_context())
+        context.run(scopes.enter_context, deadline_scope(deadline or REQUEST_DEADLINE_SECONDS))
+        events = None
+        try:
+            context.run(logger.info, "Streaming verification for claim: %.100s...", claim,
+                        extra={"event": "pipeline.claim"})
+            
+            evidence_text, evidence_list = context.run(self._gather_evidence, claim, evidence)
+            yield {"type": "evidence", "evidence": evidence_list}
+            if evidence_text is None:
+                result = context.run(self._no_evidence_result, claim)
+                self.single_flight.resolve(key, future, copy.deepcopy(result))
+                yield {"type": "result", "result": result}
+                return
+            
+            events = self.llm_client.verify_claim_stream(claim, evidence_text)
+            while True:
+                event = context.run(next, events, None)
+                if event is None:
+                    break
+                if event["type"] == "result":
+                    event["result"]["claim"] = claim
+                    event["result"]["evidence"] = evidence_list
+                    context.run(logger.info, "Verification complete: %s (confidence: %.2f)",
+                                event["result"]["verdict"], event["result"].get("confidence", 0),
+                                extra={"event": "pipeline.verdict"})
+                    self.single_flight.resolve(key, future, copy.deepcopy(event["result"]))
+                yield event
+        except Exception as e:
+            if not future.done():
+                self.single_flight.resolve(key, future, error=e)
+            raise
+        finally:
+            if not future.done():
+                # The consumer stopped reading before the result; callers waiting on it get an error
+                self.single_flight.resolve(key, future, error=RuntimeError("Streaming verification was abandoned"))
+            if events is not None:
+                context.run(events.close)
+            context.run(scopes.close)
+    
+    def verify_text(self, text: str, extract_claims: bool = True, method: str = "spacy",
+                    incremental: bool = True, deadline: Optional[float] = None,
+                    progress_callback: Optional[Callable[[Dict], None]] = None,
+                    cancel_event=None) -> List[Dict]:
+        # With a deadline, claims still unverified when it expires come back with checked=False.
+        # progress_callback gets a "claims" event once extraction is done, then one "result"
+        # event per claim as it finishes; setting cancel_event stops verification early.
+        deadline = deadline if deadline is not None else VERIFY_TEXT_DEADLINE_SECONDS
+        deadline_at = time.monotonic() + deadline if deadline is not None else None
+        with request_context():
+            if incremental and extract_claims:
+                return self._verify_text_incremental(text, method, deadline_at, progress_callback, cancel_event)
+            return self._verify_text(text, extract_claims, method, deadline_at, progress_callback, cancel_event)
+    
+    @staticmethod
+    def _report(progress_callback: Optional[Callable[[Dict], None]], event: Dict):
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(event)
+        except Exception as e:
+            logger.error("Progress callback failed: %s", e)
+    
+    def _verify_text(self, text: str, extract_claims: bool = True, method: str = "spacy",
+                     deadline_at: Optional[float] = None,
+                     progress_callback: Optional[Callable[[Dict], None]] = None,
+                     cancel_event=None) -> List[Dict]:
         logger.info("Starting text verification")
         
         if extract_claims:
@@ -82,27 +219,200 @@ class FactCheckPipeline:
         
         if not claims:
             logger.warning("No claims extracted from text")
+            self._report(progress_callback, {"type": "claims", "claims": []})
+            return []
+        
+        logger.info("Verifying %d claims", len(claims))
+        self._report(progress_callback, {"type": "claims", "claims": claims})
+        
+        verified = self._verify_prioritized(claims, deadline_at, progress_callback, cancel_event)
+        cancelled = cancel_event is not None and cancel_event.is_set()
+        results = [verified.get(claim) or self._not_checked_result(claim, cancelled) for claim in claims]
+        
+        logger.info("Text verification complete: %d claims verified, %d not checked",
+                    len(verified), len(results) - len(verified))
+        return results
+    
+    @staticmethod
+    def _not_checked_result(claim: str, cancelled: bool = False) -> Dict:
+        return {
+            "claim": claim,
+            "verdict": "Not checked",
+            "confidence": 0.0,
+            "evidence": [],
+            "reasoning": ("Cancelled before this claim was verified." if cancelled else
+                          "Not checked in time: the time budget ran out before this claim was verified."),
+            "checked": False
+        }
+    
+    def _verify_prioritized(self, claims: List[str], deadline_at: Optional[float] = None,
+                            progress_callback: Optional[Callable[[Dict], None]] = None,
+                            cancel_event=None) -> Dict[str, Dict]:
+        # Most checkable claims are submitted first, so they are the ones done when time runs out
+        if not claims:
+            return {}
+        
+        ordered = [claim for _, claim in self.retriever.prioritize_claims(claims)] if len(claims) > 1 else claims
+        
+        def run(claim: str) -> Optional[Dict]:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if deadline_at is None:
+                return self.verify_claim(claim)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                return None
+            return self.verify_claim(claim, deadline=remaining)
+        
+        executor = ThreadPoolExecutor(max_workers=min(VERIFY_TEXT_MAX_WORKERS, len(ordered)), thread_name_prefix="verify-text")
+        futures = {executor.submit(contextvars.copy_context().run, run, claim): claim for claim in ordered}
+        pending = set(futures)
+        results = {}
+        collected = set()
+        
+        def collect(future):
+            collected.add(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("Error verifying claim: %s", e)
+                return
+            if result is not None:
+                result["checked"] = True
+                results[futures[future]] = result
+                self._report(progress_callback, {"type": "result", "result": result})
+        
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Verification cancelled: finishing %d in-flight claims, skipping %d of %d",
+                            sum(future.running() for future in pending),
+                            sum(not future.running() for future in pending), len(claims))
+                break
+            timeout = 0.5
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Time budget expired: finishing %d in-flight claims, skipping %d of %d",
+                                   sum(future.running() for future in pending),
+                                   sum(not future.running() for future in pending), len(claims))
+                    break
+                timeout = min(timeout, remaining)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(future)
+        # Queued claims are dropped; claims already running are waited for (their LLM calls stop
+        # at the deadline), so a cancelled or expired request holds no LLM calls once it returns
+        executor.shutdown(wait=True, cancel_futures=True)
+        # Those claims were paid for, so their results are kept (and cached) like any other;
+        # only claims that never started come back as not checked
+        for future in futures:
+            if future not in collected and not future.cancelled():
+                collect(future)
+        return results
+    
+    def _extract_chunk_claims(self, chunk: str, method: str) -> List[str]:
+        if method == "llm":
+            return self.claim_extractor.extract_claims_llm(chunk, self.llm_client)
+        return self.claim_extractor.extract_claims(chunk)
+    
+    def _incremental_claims(self, text: str, method: str) -> List[str]:
+        chunks = split_document(text)
+        keys = [chunk_key(chunk, method) for chunk in chunks]
+        
+        claims_by_key = {}
+        changed = {}
+        for key, chunk in zip(keys, chunks):
+            if key in claims_by_key or key in changed:
+                continue
+            cached = self.incremental_cache.get_claims(key)
+            if cached is not None:
+                claims_by_key[key] = cached
+            else:
+                changed[key] = chunk
+        
+        if changed:
+            workers = min(CLAIM_EXTRACTION_MAX_WORKERS, len(changed)) if method == "llm" else 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(contextvars.copy_context().run, self._extract_chunk_claims, chunk, method)
+                    for chunk in changed.values()
+                ]
+                for key, future in zip(changed, futures):
+                    claims = future.result()
+                    self.incremental_cache.put_claims(key, claims)
+                    claims_by_key[key] = claims
+        
+        logger.info("Extracted claims from %d of %d chunks (%d unchanged)",
+                    len(changed), len(chunks), len(chunks) - len(changed))
+        
+        # The same claim appearing twice is verified once
+        seen = set()
+        claims = []
+        for key in keys:
+            for claim in claims_by_key[key]:
+                normalized = normalize_text(claim).lower()
+                if normalized not in seen:
+                    seen.add(normalized)
+                    claims.append(claim)
+        
+        if method == "llm":
+            claims = self.claim_extractor.deduplicate_claims(claims, embedder=self.embedder)
+        return claims
+    
+    def _verify_text_incremental(self, text: str, method: str = "spacy",
+                                 deadline_at: Optional[float] = None,
+                                 progress_callback: Optional[Callable[[Dict], None]] = None,
+                                 cancel_event=None) -> List[Dict]:
+        logger.info("Starting incremental text verification")
+        
+        claims = self._incremental_claims(text, method)
+        if not claims:
+            logger.warning("No claims extracted from text")
+            self._report(progress_callback, {"type": "claims", "claims": []})
             return []
+        self._report(progress_callback, {"type": "claims", "claims": claims})
+        
+        scope = self.store_manager.collection_name
+        cached = {}
+        for claim in claims:
+            result = self.incremental_cache.get_result(claim, scope)
+            if result is not None:
+                result["claim"] = claim
+                result["reused"] = True
+                result["checked"] = True
+                cached[claim] = result
+                self._report(progress_callback, {"type": "result", "result": result})
+        
+        pending = [claim for claim in claims if claim not in cached]
+        logger.info("Verifying %d claims (%d reused)", len(pending), len(cached))
         
-        logger.info(f"Verifying {len(claims)} claims")
+        def report(event: Dict):
+            event["result"]["reused"] = False
+            self.incremental_cache.put_result(event["result"]["claim"], scope, event["result"])
+            self._report(progress_callback, event)
+        
+        verified = self._verify_prioritized(pending, deadline_at, report, cancel_event)
+        cancelled = cancel_event is not None and cancel_event.is_set()
         
         results = []
-        for i, claim in enumerate(claims, 1):
-            logger.info(f"Verifying claim {i}/{len(claims)}")
-            result = self.verify_claim(claim)
+        for claim in claims:
+            result = cached.get(claim) or verified.get(claim)
+            if result is None:
+                result = dict(self._not_checked_result(claim, cancelled), reused=False)
             results.append(result)
         
-        logger.info(f"Text verification complete: {len(results)} claims verified")
+        logger.info("Text verification complete: %d claims, %d verified, %d reused, %d not checked",
+                    len(results), len(verified), len(cached), len(pending) - len(verified))
         return results
     
     def verify_multiple_claims(self, claims: List[str]) -> List[Dict]:
-        logger.info(f"Verifying {len(claims)} claims")
+        logger.info("Verifying %d claims", len(claims))
         
         results = []
         for i, claim in enumerate(claims, 1):
-            logger.info(f"Verifying claim {i}/{len(claims)}")
+            logger.info("Verifying claim %d/%d", i, len(claims), extra={"event": "pipeline.claim"})
             result = self.verify_claim(claim)
             results.append(result)
         
-        logger.info(f"Batch verification complete")
+        logger.info("Batch verification complete")
         return results
\ No newline at end of file
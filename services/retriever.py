@@ -1,9 +1,16 @@
 from typing import List, Dict, Tuple
+import logging
 import numpy as np
 import re
 
-from config import SIMILARITY_THRESHOLD, TOP_K_RETRIEVAL, TOP_K_RERANK
+from config import (
+    SIMILARITY_THRESHOLD, TOP_K_RETRIEVAL, TOP_K_RERANK, RETRIEVAL_MODE,
+    HYBRID_DENSE_WEIGHT, HYBRID_CANDIDATE_MULTIPLIER, LEXICAL_SHORTCUT_COVERAGE,
+    LEXICAL_SHORTCUT_MIN_TERMS, LEXICAL_MIN_COVERAGE, LEXICAL_MIN_SIMILARITY, RERANK_MAX_TOKENS,
+    CLAIM_PRIORITY_CHECKABILITY_WEIGHT
+)
 from models.embedder import Embedder
+from services.lexical_index import tokenize
 from services.store_manager import StoreManager
 from utils.logger import logger
 
@@ -14,27 +21,166 @@ class Retriever:
         self.store_manager = store_manager
         logger.info("Retriever initialized")
     
-    def is_vague_claim(self, claim: str) -> bool:
-        vague_terms = ["some", "many", "often", "recently", "usually", "generally", 
-                       "might", "may", "could", "possibly", "sometimes", "often"]
-        
+    VAGUE_TERMS = ["some", "many", "often", "recently", "usually", "generally", 
+                   "might", "may", "could", "possibly", "sometimes", "often"]
+    
+    def _claim_features(self, claim: str) -> Dict:
         claim_lower = claim.lower()
-        
-        vague_count = sum(1 for term in vague_terms if term in claim_lower)
+        return {
+            "vague_count": sum(1 for term in self.VAGUE_TERMS if term in claim_lower),
+            "has_date": bool(re.search(r'\d{4}|\d{1,2}[/-]\d{1,2}', claim)),
+            "has_number": bool(re.search(r'\d+', claim)),
+            "has_name": bool(re.search(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b', claim))
+        }
+    
+    def is_vague_claim(self, claim: str) -> bool:
+        features = self._claim_features(claim)
+        vague_count = features["vague_count"]
         
         if vague_count >= 2:
             return True
         
-        has_date = bool(re.search(r'\d{4}|\d{1,2}[/-]\d{1,2}', claim))
-        has_number = bool(re.search(r'\d+', claim))
-        has_name = bool(re.search(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b', claim))
-        
-        if not (has_date or has_number or has_name) and vague_count >= 1:
+        if not (features["has_date"] or features["has_number"] or features["has_name"]) and vague_count >= 1:
             return True
         
         return False
     
-    def search(self, query: str, top_k: int = None, threshold: float = None) -> List[Dict]:
+    def checkability_score(self, claim: str) -> float:
+        # Specific claims (figures, dates, named entities) are the ones a fact store can settle
+        features = self._claim_features(claim)
+        score = 0.35 * features["has_number"] + 0.35 * features["has_date"] + 0.3 * features["has_name"]
+        score -= 0.2 * features["vague_count"]
+        return min(max(score, 0.0), 1.0)
+    
+    def prioritize_claims(self, claims: List[str]) -> List[Tuple[float, str]]:
+        # Cheap to compute for a whole document: regex features plus the BM25 term coverage
+        # of the best stored fact, which needs no embedding
+        prioritized = []
+        for claim in claims:
+            score = CLAIM_PRIORITY_CHECKABILITY_WEIGHT * self.checkability_score(claim)
+            if self.store_manager.lexical_index is not None:
+                top = self.store_manager.lexical_search(claim, n_results=1)
+                coverage = top[0][2] if top else 0.0
+                score += (1.0 - CLAIM_PRIORITY_CHECKABILITY_WEIGHT) * coverage
+            prioritized.append((score, claim))
+        return sorted(prioritized, key=lambda item: item[0], reverse=True)
+    
+    def search(self, query: str, top_k: int = None, threshold: float = None, mode: str = None) -> List[Dict]:
+        mode = mode or RETRIEVAL_MODE
+        
+        if mode != "dense" and self.store_manager.lexical_index is None:
+            logger.warning("Lexical index disabled, falling back to dense retrieval")
+            mode = "dense"
+        
+        if mode == "lexical":
+            return self.lexical_search(query, top_k=top_k)
+        if mode == "hybrid":
+            return self.hybrid_search(query, top_k=top_k, threshold=threshold)
+        return self.dense_search(query, top_k=top_k, threshold=threshold)
+    
+    def _fetch_facts(self, ids: List[str], include_embeddings: bool = False) -> Dict[str, Dict]:
+        if not ids:
+            return {}
+        
+        results = self.store_manager.get_facts_by_ids(ids, include_embeddings=include_embeddings)
+        embeddings = results.get('embeddings')
+        facts = {}
+        for i, fact_id in enumerate(results['ids']):
+            facts[fact_id] = {
+                'text': results['documents'][i],
+                'metadata': results['metadatas'][i] if results['metadatas'] else {},
+                'id': fact_id,
+                'embedding': embeddings[i] if include_embeddings and embeddings is not None else None
+            }
+        return facts
+    
+    def lexical_search(self, query: str, top_k: int = None) -> List[Dict]:
+        top_k = top_k or TOP_K_RETRIEVAL
+        
+        try:
+            hits = [hit for hit in self.store_manager.lexical_search(query, n_results=top_k)
+                    if hit[2] >= LEXICAL_MIN_COVERAGE]
+            stored = self._fetch_facts([fact_id for fact_id, _, _ in hits])
+            
+            facts = []
+            for fact_id, score, coverage in hits:
+                if fact_id not in stored:
+                    continue
+                fact = stored[fact_id]
+                del fact['embedding']
+                # No dense score here: query-term coverage ranks the facts, but it is not a cosine
+                fact.update(coverage=coverage, lexical_score=score, score=coverage)
+                facts.append(fact)
+            
+            logger.info("Retrieved %d facts from lexical index", len(facts), extra={"event": "retriever.retrieved"})
+            return facts
+        
+        except Exception as e:
+            logger.error("Error during lexical search: %s", e)
+            return []
+    
+    def hybrid_search(self, query: str, top_k: int = None, threshold: float = None) -> List[Dict]:
+        top_k = top_k or TOP_K_RETRIEVAL
+        threshold = threshold or SIMILARITY_THRESHOLD
+        candidates = top_k * HYBRID_CANDIDATE_MULTIPLIER
+        
+        try:
+            lexical_hits = self.store_manager.lexical_search(query, n_results=candidates)
+            
+            # A near-verbatim quote of a stored fact does not need a vector query
+            if (lexical_hits and lexical_hits[0][2] >= LEXICAL_SHORTCUT_COVERAGE
+                    and len(set(tokenize(query))) >= LEXICAL_SHORTCUT_MIN_TERMS):
+                logger.info("Lexical match covers the claim, skipping vector search",
+                            extra={"event": "retriever.retrieved"})
+                return self.lexical_search(query, top_k=top_k)
+            
+            query_embedding = self.embedder.embed_query(query)
+            results = self.store_manager.search(query_embedding, n_results=candidates)
+            
+            facts = {}
+            if results['documents'] and results['documents'][0]:
+                for i, doc in enumerate(results['documents'][0]):
+                    fact_id = results['ids'][0][i]
+                    facts[fact_id] = {
+                        'text': doc,
+                        'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
+                        'similarity': self.store_manager.similarity(results['distances'][0][i]),
+                        'id': fact_id
+                    }
+            
+            lexical_only = [fact_id for fact_id, _, _ in lexical_hits if fact_id not in facts]
+            for fact_id, fact in self._fetch_facts(lexical_only, include_embeddings=True).items():
+                embedding = fact.pop('embedding')
+                fact['similarity'] = float(np.dot(query_embedding, embedding)) if embedding is not None else 0.0
+                facts[fact_id] = fact
+            
+            max_lexical = lexical_hits[0][1] if lexical_hits else 0.0
+            lexical = {fact_id: (score, coverage) for fact_id, score, coverage in lexical_hits}
+            
+            fused = []
+            for fact_id, fact in facts.items():
+                score, coverage = lexical.get(fact_id, (0.0, 0.0))
+                lexical_norm = score / max_lexical if max_lexical > 0 else 0.0
+                fact['lexical_score'] = score
+                fact['coverage'] = coverage
+                fact['score'] = HYBRID_DENSE_WEIGHT * fact['similarity'] + (1.0 - HYBRID_DENSE_WEIGHT) * lexical_norm
+                
+                # Strong term overlap (numbers, names) keeps a fact the dense score alone would drop,
+                # as long as it is still about the same thing
+                if fact['similarity'] >= threshold or (coverage >= LEXICAL_MIN_COVERAGE
+                                                       and fact['similarity'] >= LEXICAL_MIN_SIMILARITY):
+                    fused.append(fact)
+            
+            fused.sort(key=lambda x: x['score'], reverse=True)
+            logger.info("Retrieved %d facts with hybrid search", min(len(fused), top_k),
+                        extra={"event": "retriever.retrieved"})
+            return fused[:top_k]
+        
+        except Exception as e:
+            logger.error("Error during hybrid search: %s", e)
+            return []
+    
+    def dense_search(self, query: str, top_k: int = None, threshold: float = None) -> List[Dict]:
         top_k = top_k or TOP_K_RETRIEVAL
         threshold = threshold or SIMILARITY_THRESHOLD
         
@@ -44,13 +190,15 @@ class Retriever:
             results = self.store_manager.search(query_embedding, n_results=top_k)
             
             facts = []
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
             if results['documents'] and results['documents'][0]:
                 for i, doc in enumerate(results['documents'][0]):
                     distance = results['distances'][0][i] if results['distances'] else 0.0
-                    similarity = 1.0 - distance
+                    similarity = self.store_manager.similarity(distance)
                     
-                    if i < 3:
-                        logger.debug(f"Top result {i+1}: similarity={similarity:.3f}, text={doc[:80]}...")
+                    if debug_enabled and i < 3:
+                        logger.debug("Top result %d: similarity=%.3f, text=%.80s...", i + 1, similarity, doc,
+                                     extra={"event": "retriever.top_result"})
                     
                     if similarity >= threshold:
                         fact = {
@@ -63,14 +211,15 @@ class Retriever:
             
             if not facts and results['documents'] and results['documents'][0]:
                 top_distance = results['distances'][0][0] if results['distances'] and results['distances'][0] else 1.0
-                top_similarity = 1.0 - top_distance
-                logger.warning(f"No facts above threshold {threshold}. Top similarity: {top_similarity:.3f}")
+                top_similarity = self.store_manager.similarity(top_distance)
+                logger.warning("No facts above threshold %s. Top similarity: %.3f", threshold, top_similarity)
             
-            logger.info(f"Retrieved {len(facts)} facts above threshold {threshold}")
+            logger.info("Retrieved %d facts above threshold %s", len(facts), threshold,
+                        extra={"event": "retriever.retrieved"})
             return facts
         
         except Exception as e:
-            logger.error(f"Error during search: {str(e)}")
+            logger.error("Error during search: %s", e)
             return []
     
     def rerank(self, query: str, facts: List[Dict], top_k: int = None, llm_client = None) -> List[Dict]:
@@ -82,11 +231,11 @@ class Retriever:
         if llm_client:
             return self._rerank_with_llm(query, facts, top_k, llm_client)
         else:
-            facts_sorted = sorted(facts, key=lambda x: x['similarity'], reverse=True)
+            facts_sorted = sorted(facts, key=lambda x: x.get('score', x['similarity']), reverse=True)
             return facts_sorted[:top_k]
     
     def _rerank_with_llm(self, query: str, facts: List[Dict], top_k: int, llm_client) -> List[Dict]:
-        from utils.prompts import RERANKING_PROMPT
+        from utils.prompts import RERANKING_PROMPT, RERANKING_SYSTEM_PROMPT, RERANK_TOOL
         
         results_text = "\n".join([
             f"{i+1}. {fact['text']}\n   Source: {fact['metadata'].get('source', 'unknown')}"
@@ -100,8 +249,10 @@ class Retriever:
         )
         
         try:
-            response = llm_client.generate(prompt)
-            ranked_indices = [int(x.strip()) - 1 for x in response.split(',')]
+            result = llm_client.generate_structured(
+                prompt, RERANK_TOOL, system_prompt=RERANKING_SYSTEM_PROMPT, hedge=True, max_tokens=RERANK_MAX_TOKENS
+            )
+            ranked_indices = list(dict.fromkeys(int(x) - 1 for x in result['ranking']))
             
             reranked = [facts[i] for i in ranked_indices if 0 <= i < len(facts)]
             
@@ -111,14 +262,15 @@ class Retriever:
             return reranked[:top_k]
         
         except Exception as e:
-            logger.error(f"Error in LLM re-ranking: {str(e)}")
-            facts_sorted = sorted(facts, key=lambda x: x['similarity'], reverse=True)
+            logger.error("Error in LLM re-ranking: %s", e)
+            facts_sorted = sorted(facts, key=lambda x: x.get('score', x['similarity']), reverse=True)
             return facts_sorted[:top_k]
     
     def search_and_rerank(self, query: str, top_k: int = None, llm_client = None) -> List[Dict]:
         facts = self.search(query, top_k=TOP_K_RETRIEVAL)
         reranked = self.rerank(query, facts, top_k=top_k, llm_client=llm_client)
         
-        logger.info(f"Search and re-ranking completed, returning {len(reranked)} facts")
+        logger.info("Search and re-ranking completed, returning %d facts", len(reranked),
+                    extra={"event": "retriever.retrieved"})
         return reranked
 
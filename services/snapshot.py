@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import SNAPSHOT_DTYPE, SNAPSHOT_BATCH_SIZE
+from utils.logger import logger
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+FACTS_FILE = "facts.npz"
+METADATA_PREFIX = "meta__"
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _metadata_columns(metadatas: List[Dict]) -> Dict[str, np.ndarray]:
+    # One column per metadata key; values are JSON-encoded so ints, floats and bools survive
+    keys = sorted({key for metadata in metadatas for key in (metadata or {})})
+    return {
+        METADATA_PREFIX + key: np.array(
+            [json.dumps((metadata or {}).get(key)) for metadata in metadatas], dtype=object
+        ).astype(str)
+        for key in keys
+    }
+
+
+def export_snapshot(store_manager, output_dir: str, dtype: str = None, batch_size: int = None) -> Dict:
+    dtype = np.dtype(dtype or SNAPSHOT_DTYPE)
+    if dtype not in (np.float32, np.float16):
+        raise SnapshotError(f"Unsupported snapshot dtype: {dtype}")
+    batch_size = batch_size or SNAPSHOT_BATCH_SIZE
+    
+    collection = store_manager.collection
+    active = store_manager.active_version
+    total = collection.count()
+    
+    # Written next to the target and renamed at the end, so a half-written snapshot is never picked up
+    tmp_dir = output_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    
+    started = time.perf_counter()
+    vectors = np.lib.format.open_memmap(
+        os.path.join(tmp_dir, VECTORS_FILE), mode="w+", dtype=dtype, shape=(total, int(active["dimension"]))
+    )
+    ids, documents, metadatas = [], [], []
+    norms_ok = True
+    
+    while len(ids) < total:
+        batch = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            offset=len(ids),
+            limit=min(batch_size, total - len(ids))
+        )
+        if not batch["ids"]:
+            break
+        
+        embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+        norms_ok = norms_ok and bool(np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-3))
+        vectors[len(ids):len(ids) + len(embeddings)] = embeddings
+        ids.extend(batch["ids"])
+        documents.extend(batch["documents"])
+        metadatas.extend(batch["metadatas"] or [{}] * len(batch["ids"]))
+    
+    vectors.flush()
+    del vectors
+    if len(ids) < total:
+        # Facts were deleted while exporting; drop the unused tail rows
+        rows = np.load(os.path.join(tmp_dir, VECTORS_FILE), mmap_mode="r")[:len(ids)]
+        np.save(os.path.join(tmp_dir, VECTORS_FILE + ".part"), rows)
+        del rows
+        os.replace(os.path.join(tmp_dir, VECTORS_FILE + ".part.npy"), os.path.join(tmp_dir, VECTORS_FILE))
+    
+    np.savez_compressed(
+        os.path.join(tmp_dir, FACTS_FILE),
+        ids=np.array(ids, dtype=object).astype(str),
+        documents=np.array(documents, dtype=object).astype(str),
+        **_metadata_columns(metadatas)
+    )
+    
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "collection": store_manager.collection_name,
+        "model": active["model"],
+        "dimension": int(active["dimension"]),
+        "count": len(ids),
+        "dtype": dtype.name,
+        "normalized": norms_ok,
+        "files": {
+            name: {"bytes": os.path.getsize(os.path.join(tmp_dir, name)), "sha256": file_sha256(os.path.join(tmp_dir, name))}
+            for name in (VECTORS_FILE, FACTS_FILE)
+        }
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    
+    logger.info("Exported %d facts (%s, dim %d) to %s in %.1fs",
+                len(ids), dtype.name, manifest["dimension"], output_dir, time.perf_counter() - started)
+    return manifest
+
+
+class Snapshot:
+    
+    def __init__(self, path: str, mmap: bool = True, verify: bool = True):
+        self.path = path
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise SnapshotError(f"No snapshot manifest found in {path}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format: {self.manifest.get('format_version')}")
+        if verify:
+            self.verify()
+        
+        # Memory-mapped vectors are paged in by the OS on first use instead of read up front
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r" if mmap else None)
+        if self.vectors.shape != (self.manifest["count"], self.manifest["dimension"]):
+            raise SnapshotError(f"Vector array shape {self.vectors.shape} does not match the manifest")
+        
+        with np.load(os.path.join(path, FACTS_FILE), allow_pickle=False) as facts:
+            self.ids = facts["ids"].tolist()
+            self.documents = facts["documents"].tolist()
+            self._metadata_columns = {
+                key[len(METADATA_PREFIX):]: facts[key] for key in facts.files if key.startswith(METADATA_PREFIX)
+            }
+    
+    @property
+    def model(self) -> str:
+        return self.manifest["model"]
+    
+    @property
+    def dimension(self) -> int:
+        return self.manifest["dimension"]
+    
+    def __len__(self) -> int:
+        return self.manifest["count"]
+    
+    def verify(self):
+        for name, expected in self.manifest["files"].items():
+            actual = file_sha256(os.path.join(self.path, name))
+            if actual != expected["sha256"]:
+                raise SnapshotError(f"Checksum mismatch for {name} in {self.path}")
+    
+    def metadatas(self, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        end = len(self) if end is None else end
+        rows = [{} for _ in range(start, end)]
+        for key, column in self._metadata_columns.items():
+            for row, value in zip(rows, column[start:end].tolist()):
+                value = json.loads(value)
+                if value is not None:
+                    row[key] = value
+        return rows
+    
+    def batches(self, batch_size: int = None):
+        batch_size = batch_size or SNAPSHOT_BATCH_SIZE
+        for start in range(0, len(self), batch_size):
+            end = min(start + batch_size, len(self))
+            yield (
+                self.ids[start:end],
+                np.asarray(self.vectors[start:end], dtype=np.float32),
+                self.documents[start:end],
+                self.metadatas(start, end)
+            )
+
+
+def import_snapshot(store_manager, path: str, batch_size: int = None, switch: bool = True, verify: bool = True) -> Dict:
+    started = time.perf_counter()
+    snapshot = Snapshot(path, mmap=True, verify=verify)
+    
+    if switch and not store_manager.version_matches({"model": snapshot.model, "dimension": snapshot.dimension}):
+        raise SnapshotError(
+            f"Snapshot was built with {snapshot.model} (dim {snapshot.dimension}) but this node is configured "
+            f"for {store_manager.expected_model} (dim {store_manager.expected_dimension})"
+        )
+    
+    target = store_manager.get_or_create_versioned_collection(snapshot.model, snapshot.dimension, status="importing")
+    store_manager.set_collection_status(target, "importing")
+    
+    # Vectors go in as stored; nothing is re-embedded
+    max_batch = store_manager.client.get_max_batch_size() if hasattr(store_manager.client, "get_max_batch_size") else None
+    batch_size = min(batch_size or SNAPSHOT_BATCH_SIZE, max_batch or SNAPSHOT_BATCH_SIZE)
+    imported = 0
+    for ids, embeddings, documents, metadatas in snapshot.batches(batch_size):
+        target.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=[m or None for m in metadatas])
+        imported += len(ids)
+        logger.debug("Imported %d/%d facts", imported, len(snapshot))
+    
+    # A replica mirrors the snapshot, so facts it does not contain are removed
+    stale = list(set(target.get(include=[])["ids"]) - set(snapshot.ids))
+    for start in range(0, len(stale), batch_size):
+        target.delete(ids=stale[start:start + batch_size])
+    if stale:
+        logger.info("Removed %d facts not present in the snapshot", len(stale))
+    
+    store_manager.set_collection_status(target, "ready")
+    
+    if switch:
+        store_manager.switch_active_collection(target.name, snapshot.model, snapshot.dimension)
+        if store_manager.lexical_index is not None:
+            store_manager.rebuild_lexical_index()
+    
+    elapsed = time.perf_counter() - started
+    logger.info("Imported %d facts from %s into %s in %.1fs", imported, path, target.name, elapsed)
+    return {"collection": target.name, "imported": imported, "seconds": elapsed, "switched": switch}
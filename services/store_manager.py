@@ -1,63 +1,292 @@
 from typing import List, Dict, Optional
+import json
+import os
+import re
+import time
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
-from config import CHROMA_DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL, EMBEDDING_DIMENSION
+from config import (
+    CHROMA_DB_PATH, COLLECTION_NAME, EMBEDDING_MODEL, EMBEDDING_DIMENSION,
+    ACTIVE_COLLECTION_FILE, ACTIVE_COLLECTION_CHECK_INTERVAL,
+    LEXICAL_INDEX_ENABLED, LEXICAL_INDEX_FILE,
+    VECTOR_SPACE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+)
+from services.lexical_index import LexicalIndex
 from utils.logger import logger
 
 
+def versioned_collection_name(base_name: str, model_name: str, dimension: int) -> str:
+    model_slug = re.sub(r'[^a-z0-9]+', '-', model_name.lower()).strip('-')
+    suffix = f"__d{dimension}"
+    name = f"{base_name}__{model_slug}"[:63 - len(suffix)].rstrip('-_.')
+    return name + suffix
+
+
+def hnsw_metadata(space: str = None, m: int = None, ef_construction: int = None, ef_search: int = None) -> Dict:
+    return {
+        "hnsw:space": space or VECTOR_SPACE,
+        "hnsw:M": m or HNSW_M,
+        "hnsw:construction_ef": ef_construction or HNSW_EF_CONSTRUCTION,
+        "hnsw:search_ef": ef_search or HNSW_EF_SEARCH
+    }
+
+
+def hnsw_settings(collection) -> Dict:
+    # Newer Chroma versions keep the index settings in the collection configuration and
+    # drop them from metadata on modify; older ones only have the metadata keys
+    configuration = getattr(collection, "configuration", None)
+    hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+    if hnsw:
+        return {"space": hnsw.get("space", "l2"), "m": hnsw.get("max_neighbors"),
+                "ef_construction": hnsw.get("ef_construction"), "ef_search": hnsw.get("ef_search")}
+    # vector_space survives the modify() that strips the hnsw: keys on some versions
+    metadata = collection.metadata or {}
+    space = metadata.get("hnsw:space") or metadata.get("vector_space") or "l2"
+    return {"space": space, "m": metadata.get("hnsw:M"),
+            "ef_construction": metadata.get("hnsw:construction_ef"), "ef_search": metadata.get("hnsw:search_ef")}
+
+
+def set_search_ef(collection, ef_search: int) -> bool:
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+        return True
+    except Exception as e:
+        logger.warning("Cannot change ef_search of %s on this Chroma version: %s", collection.name, e)
+        return False
+
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    # Chroma reports squared L2 for "l2" and 1 - dot product for "cosine" and "ip";
+    # embeddings are unit length, so each maps back to cosine similarity
+    if space == "l2":
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+
 class StoreManager:
     
-    def __init__(self, collection_name: str = None, persist_directory: str = None):
-        self.collection_name = collection_name or COLLECTION_NAME
+    def __init__(self, collection_name: str = None, persist_directory: str = None,
+                 model_name: str = None, dimension: int = None):
+        self.base_collection_name = collection_name or COLLECTION_NAME
         self.persist_directory = persist_directory or CHROMA_DB_PATH
-        self.expected_dimension = EMBEDDING_DIMENSION
+        self.expected_model = model_name or EMBEDDING_MODEL
+        self.expected_dimension = dimension or EMBEDDING_DIMENSION
+        self.pointer_path = os.path.join(self.persist_directory, ACTIVE_COLLECTION_FILE)
         
         self.client = chromadb.PersistentClient(
             path=self.persist_directory,
             settings=Settings(anonymized_telemetry=False)
         )
         
-        try:
-            self.collection = self.client.get_collection(name=self.collection_name)
-            # Check if dimension matches
+        self._pointer_mtime = None
+        self._last_pointer_check = time.monotonic()
+        self.lexical_index = None
+        
+        active = self.read_active_pointer()
+        if active is None:
+            active = self._adopt_legacy_or_create()
+        
+        if not self.version_matches(active):
+            # Before or after a switch, processes stay pinned to the version their embedder can query
+            active = self._find_ready_version(self.expected_model, self.expected_dimension) or active
+        
+        self._open_active(active)
+    
+    def lexical_index_path(self, collection_name: str = None) -> str:
+        # Each collection version has its own index, so a switch never reads another's postings
+        return os.path.join(self.persist_directory, f"{collection_name or self.collection_name}.{LEXICAL_INDEX_FILE}")
+    
+    def _load_lexical_index(self) -> LexicalIndex:
+        index = LexicalIndex(self.lexical_index_path())
+        
+        if len(index) == 0 and self.count() > 0:
+            # Existing stores predate the lexical index; build it once from the collection
+            index = self.rebuild_lexical_index()
+        return index
+    
+    def rebuild_lexical_index(self) -> LexicalIndex:
+        logger.info("Building lexical index from %s", self.collection_name)
+        index = LexicalIndex()
+        index.path = self.lexical_index_path()
+        facts = self.collection.get(include=["documents"])
+        index.add(facts["ids"], facts["documents"])
+        index.save(merge=False)
+        if self.lexical_index is not None:
+            self.lexical_index = index
+        return index
+    
+    def flush_lexical_index(self):
+        if self.lexical_index is not None and self.lexical_index.dirty:
+            self.lexical_index.save()
+    
+    def _collection_metadata(self, model_name: str, dimension: int) -> Dict:
+        return dict({
+            "description": "Verified facts database",
+            "embedding_model": model_name,
+            "embedding_dimension": dimension,
+            "vector_space": VECTOR_SPACE
+        }, **hnsw_metadata())
+    
+    def get_or_create_versioned_collection(self, model_name: str, dimension: int, status: str = "ready"):
+        name = versioned_collection_name(self.base_collection_name, model_name, dimension)
+        return self.client.get_or_create_collection(
+            name=name,
+            metadata=dict(self._collection_metadata(model_name, dimension), status=status)
+        )
+    
+    def set_collection_status(self, collection, status: str):
+        # Index settings cannot be re-sent through modify once the collection exists, and
+        # modify replaces the metadata, so the space is kept under a plain key
+        space = hnsw_settings(collection)["space"]
+        metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+        metadata.setdefault("vector_space", space)
+        metadata["status"] = status
+        collection.modify(metadata=metadata)
+    
+    def _find_ready_version(self, model_name: str, dimension: int) -> Optional[Dict]:
+        candidates = [versioned_collection_name(self.base_collection_name, model_name, dimension), self.base_collection_name]
+        for name in candidates:
             try:
-                # Try to get a sample to check dimension
-                sample = self.collection.peek(limit=1)
-                if sample.get('embeddings') and len(sample['embeddings']) > 0:
-                    existing_dim = len(sample['embeddings'][0])
-                    if existing_dim != self.expected_dimension:
-                        logger.warning(f"Collection has dimension {existing_dim} but expected {self.expected_dimension}")
-                        logger.info(f"Deleting old collection to recreate with correct dimension")
-                        self.client.delete_collection(name=self.collection_name)
-                        self.collection = self.client.create_collection(
-                            name=self.collection_name,
-                            metadata={"description": "Verified facts database", "embedding_dimension": self.expected_dimension}
-                        )
-                        logger.info(f"Created new collection: {self.collection_name} with dimension {self.expected_dimension}")
-                    else:
-                        logger.info(f"Loaded existing collection: {self.collection_name}")
-            except Exception as e:
-                logger.warning(f"Could not verify collection dimension: {str(e)}")
-                logger.info(f"Using existing collection: {self.collection_name}")
+                collection = self.client.get_collection(name=name)
+            except Exception:
+                continue
+            metadata = collection.metadata or {}
+            if metadata.get("embedding_model", model_name) != model_name:
+                continue
+            if int(metadata.get("embedding_dimension", dimension)) != dimension:
+                continue
+            if metadata.get("status", "ready") != "ready" or collection.count() == 0:
+                continue
+            return {"collection": name, "model": model_name, "dimension": dimension}
+        return None
+    
+    def _adopt_legacy_or_create(self) -> Dict:
+        # Collections created before versioning used the bare base name
+        try:
+            legacy = self.client.get_collection(name=self.base_collection_name)
+            metadata = legacy.metadata or {}
+            active = {
+                "collection": legacy.name,
+                "model": metadata.get("embedding_model", self.expected_model),
+                "dimension": int(metadata.get("embedding_dimension", self.expected_dimension))
+            }
+            logger.info("Adopting existing collection %s as the active version", legacy.name)
         except Exception:
-            self.collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Verified facts database", "embedding_dimension": self.expected_dimension}
+            collection = self.get_or_create_versioned_collection(self.expected_model, self.expected_dimension)
+            active = {
+                "collection": collection.name,
+                "model": self.expected_model,
+                "dimension": self.expected_dimension
+            }
+            logger.info("Created new collection: %s with dimension %d", collection.name, self.expected_dimension)
+        
+        self.write_active_pointer(active)
+        return active
+    
+    def _open_active(self, active: Dict):
+        self.collection = self.client.get_collection(name=active["collection"])
+        self.collection_name = self.collection.name
+        self.active_version = active
+        
+        index = hnsw_settings(self.collection)
+        self.distance_space = index["space"]
+        if index["ef_search"] is not None and index["ef_search"] != HNSW_EF_SEARCH:
+            if set_search_ef(self.collection, HNSW_EF_SEARCH):
+                logger.info("Set ef_search of %s to %d", self.collection_name, HNSW_EF_SEARCH)
+        if self.distance_space != VECTOR_SPACE:
+            # Collections built before the space was configured keep theirs; similarities are still cosine
+            logger.info("Collection %s uses the %s space (configured: %s); re-create or migrate it to switch",
+                        self.collection_name, self.distance_space, VECTOR_SPACE)
+        
+        if not self.version_matches(active):
+            # Keep serving the existing collection; a migration replaces it without downtime
+            logger.warning(
+                f"Active collection {self.collection_name} was built with {active['model']} "
+                f"(dim {active['dimension']}) but configured model is {self.expected_model} "
+                f"(dim {self.expected_dimension}). Run scripts/migrate_embeddings.py to re-embed."
+            )
+        else:
+            logger.info("Loaded existing collection: %s", self.collection_name)
+        
+        if LEXICAL_INDEX_ENABLED:
+            self.lexical_index = self._load_lexical_index()
+    
+    def version_matches(self, version: Dict) -> bool:
+        return (
+            version.get("model") == self.expected_model
+            and int(version.get("dimension", 0)) == self.expected_dimension
+        )
+    
+    def read_active_pointer(self) -> Optional[Dict]:
+        try:
+            self._pointer_mtime = os.stat(self.pointer_path).st_mtime_ns
+            with open(self.pointer_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read active collection pointer: %s", e)
+            return None
+    
+    def write_active_pointer(self, active: Dict):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.pointer_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(active, switched_at=time.time()), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        self._pointer_mtime = os.stat(self.pointer_path).st_mtime_ns
+    
+    def switch_active_collection(self, collection_name: str, model_name: str, dimension: int):
+        active = {"collection": collection_name, "model": model_name, "dimension": dimension}
+        self.write_active_pointer(active)
+        logger.info("Switched active collection to %s (%s, dim %d)", collection_name, model_name, dimension)
+        
+        if self.version_matches(active):
+            self._open_active(active)
+    
+    def refresh_active_collection(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_pointer_check < ACTIVE_COLLECTION_CHECK_INTERVAL:
+            return
+        self._last_pointer_check = now
+        
+        try:
+            mtime = os.stat(self.pointer_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        
+        active = self.read_active_pointer()
+        if not active or active.get("collection") == self.collection_name:
+            return
+        
+        # Only follow a switch this process can query with its own embedder
+        if self.version_matches(active):
+            logger.info("Active collection changed, switching to %s", active["collection"])
+            self._open_active(active)
+        else:
+            logger.warning(
+                "Active collection changed to %s (%s), which does not match this process's embedder; "
+                "continuing to serve %s", active["collection"], active.get("model"), self.collection_name
             )
-            logger.info(f"Created new collection: {self.collection_name} with dimension {self.expected_dimension}")
     
-    def add_facts(self, facts: List[Dict], embeddings: List[List[float]], metadatas: List[Dict] = None):
-        if not facts or not embeddings:
+    def add_facts(self, facts: List[Dict], embeddings: np.ndarray, metadatas: List[Dict] = None):
+        if not facts or embeddings is None or len(embeddings) == 0:
             logger.warning("No facts or embeddings provided")
             return
         
         if len(facts) != len(embeddings):
             raise ValueError("Number of facts must match number of embeddings")
         
+        # Writes always check the pointer, so nothing lands in a collection a migration retired
+        self.refresh_active_collection(force=True)
         documents = [fact.get('fact', fact.get('text', str(fact))) for fact in facts]
-        import time
         base_id = int(time.time() * 1000)
         ids = [f"fact_{base_id}_{i}" for i in range(len(documents))]
         
@@ -78,24 +307,32 @@ class StoreManager:
                 metadatas=metadatas,
                 ids=ids
             )
-            logger.info(f"Added {len(facts)} facts to collection")
+            if self.lexical_index is not None:
+                # Persisted by flush_lexical_index() once the caller finishes its batches
+                self.lexical_index.add(ids, documents)
+            logger.info("Added %d facts to collection", len(facts))
         
         except Exception as e:
             logger.error(f"Error adding facts to database: {str(e)}")
             raise
     
-    def search(self, query_embedding: List[float], n_results: int = 5, where: Dict = None) -> Dict:
+    def similarity(self, distance: float) -> float:
+        return distance_to_similarity(distance, self.distance_space)
+    
+    def search(self, query_embedding: np.ndarray, n_results: int = 5, where: Dict = None) -> Dict:
+        self.refresh_active_collection()
         try:
             results = self.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
                 where=where
             )
-            logger.debug(f"Search returned {len(results.get('documents', [{}])[0])} results")
+            logger.debug("Search returned %d results", len(results.get('documents', [[]])[0]),
+                         extra={"event": "store.search"})
             return results
         
         except Exception as e:
-            logger.error(f"Error searching database: {str(e)}")
+            logger.error("Error searching database: %s", e)
             return {
                 'documents': [[]],
                 'metadatas': [[]],
@@ -103,6 +340,20 @@ class StoreManager:
                 'ids': [[]]
             }
     
+    def lexical_search(self, query: str, n_results: int = 5):
+        self.refresh_active_collection()
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, top_k=n_results)
+    
+    def get_facts_by_ids(self, ids: List[str], include_embeddings: bool = False) -> Dict:
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        try:
+            return self.collection.get(ids=ids, include=include)
+        except Exception as e:
+            logger.error("Error fetching facts by ID: %s", e)
+            return {'ids': [], 'documents': [], 'metadatas': [], 'embeddings': []}
+    
     def get_all_facts(self) -> List[Dict]:
         try:
             results = self.collection.get()
@@ -123,25 +374,42 @@ class StoreManager:
             return []
     
     def delete_fact(self, fact_id: str):
+        self.refresh_active_collection(force=True)
         try:
             self.collection.delete(ids=[fact_id])
+            if self.lexical_index is not None:
+                self.lexical_index.delete([fact_id])
+                self.lexical_index.save()
             logger.info(f"Deleted fact with ID: {fact_id}")
         except Exception as e:
             logger.error(f"Error deleting fact: {str(e)}")
             raise
     
     def update_fact(self, fact_id: str, fact: str, metadata: Dict = None):
+        self.refresh_active_collection(force=True)
         try:
             self.collection.delete(ids=[fact_id])
+            if self.lexical_index is not None:
+                self.lexical_index.delete([fact_id])
+                self.lexical_index.save()
             logger.warning(f"Update for {fact_id} requires re-adding with new embedding")
         except Exception as e:
             logger.error(f"Error updating fact: {str(e)}")
             raise
     
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        self.refresh_active_collection(force=True)
+        try:
+            self.collection.update(ids=ids, metadatas=metadatas)
+            logger.info("Updated metadata of %d facts", len(ids))
+        except Exception as e:
+            logger.error("Error updating fact metadata: %s", e)
+            raise
+    
     def count(self) -> int:
         try:
             count = self.collection.count()
-            logger.debug(f"Collection contains {count} facts")
+            logger.debug("Collection contains %d facts", count)
             return count
         except Exception as e:
             logger.error(f"Error counting facts: {str(e)}")
@@ -0,0 +1,358 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    WORK_QUEUE_URL, WORK_QUEUE_LEASE_SECONDS, WORK_QUEUE_MAX_ATTEMPTS,
+    WORK_QUEUE_RETRY_BACKOFF, WORK_QUEUE_POLL_INTERVAL
+)
+from models.llm_client import is_failed_verification
+from utils.logger import logger, request_context
+from utils.sqlite_store import SQLiteStore
+
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_DEAD = "dead"
+
+
+class VerificationFailed(RuntimeError):
+    pass
+
+
+class Broker(ABC):
+    # Interface every broker implements. Jobs are plain dicts with id, kind, payload,
+    # status, attempts, max_attempts, lease_token, result and error.
+    
+    @abstractmethod
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, max_attempts: int = None) -> str:
+        pass
+    
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float = None) -> Optional[Dict]:
+        pass
+    
+    @abstractmethod
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float = None) -> bool:
+        pass
+    
+    @abstractmethod
+    def complete(self, job_id: str, lease_token: str, result) -> bool:
+        pass
+    
+    @abstractmethod
+    def fail(self, job_id: str, lease_token: str, error: str) -> Optional[str]:
+        pass
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        pass
+    
+    @abstractmethod
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        pass
+    
+    @abstractmethod
+    def requeue(self, job_id: str) -> bool:
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict:
+        pass
+    
+    def enqueue_claim(self, claim: str, evidence: Optional[str] = None, **kwargs) -> str:
+        return self.enqueue("claim", {"claim": claim, "evidence": evidence}, **kwargs)
+    
+    def enqueue_text(self, text: str, extract_claims: bool = True, method: str = "spacy", **kwargs) -> str:
+        return self.enqueue("text", {"text": text, "extract_claims": extract_claims, "method": method}, **kwargs)
+    
+    def wait(self, job_ids: List[str], timeout: float = None, poll_interval: float = None) -> Dict[str, Dict]:
+        # Returns every finished (done or dead) job; unfinished ones are left out on timeout
+        poll_interval = poll_interval or WORK_QUEUE_POLL_INTERVAL
+        deadline = None if timeout is None else time.monotonic() + timeout
+        finished = {}
+        while True:
+            for job_id in job_ids:
+                if job_id not in finished:
+                    job = self.get(job_id)
+                    if job is not None and job["status"] in (JOB_DONE, JOB_DEAD):
+                        finished[job_id] = job
+            if len(finished) == len(job_ids) or (deadline is not None and time.monotonic() >= deadline):
+                return finished
+            time.sleep(poll_interval)
+    
+    def close(self):
+        pass
+
+
+class SQLiteBroker(Broker):
+    # Good for one host, or several processes sharing a local disk. SQLite over network
+    # filesystems has unreliable locking, so multi-node setups should register a
+    # server-backed broker with register_broker().
+    
+    def __init__(self, path: str, max_attempts: int = None, retry_backoff: float = None):
+        self.path = path
+        self.max_attempts = max_attempts or WORK_QUEUE_MAX_ATTEMPTS
+        self.retry_backoff = WORK_QUEUE_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        self._db = SQLiteStore(path)
+        
+        with self._db.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_token TEXT,
+                    leased_by TEXT,
+                    lease_expires_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at, priority)")
+    
+    @staticmethod
+    def _row_to_job(row) -> Dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+    
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, max_attempts: int = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, priority, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), JOB_QUEUED, priority,
+                 max_attempts or self.max_attempts, now, now, now)
+            )
+        return job_id
+    
+    def lease(self, worker_id: str, lease_seconds: float = None) -> Optional[Dict]:
+        lease_seconds = lease_seconds or WORK_QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self._db.transaction() as conn:
+            # Leases that ran out belong to workers that died or stalled; those jobs that
+            # used up their attempts are dead-lettered, the rest become visible again
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(error, 'lease expired'), lease_token = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires_at <= ? AND attempts >= max_attempts",
+                (JOB_DEAD, now, JOB_LEASED, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at <= ?) "
+                "ORDER BY priority DESC, available_at, created_at LIMIT 1",
+                (JOB_QUEUED, now, JOB_LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            lease_token = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_token = ?, leased_by = ?, "
+                "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (JOB_LEASED, lease_token, worker_id, now + lease_seconds, now, row["id"])
+            )
+            job = self._row_to_job(row)
+        job.update(status=JOB_LEASED, attempts=job["attempts"] + 1, lease_token=lease_token, leased_by=worker_id)
+        return job
+    
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float = None) -> bool:
+        lease_seconds = lease_seconds or WORK_QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self._db.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND lease_token = ? AND status = ?",
+                (now + lease_seconds, now, job_id, lease_token, JOB_LEASED)
+            ).rowcount
+        return updated == 1
+    
+    def complete(self, job_id: str, lease_token: str, result) -> bool:
+        # A worker whose lease was taken over cannot overwrite the new holder's outcome
+        with self._db.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = ?",
+                (JOB_DONE, json.dumps(result), time.time(), job_id, lease_token, JOB_LEASED)
+            ).rowcount
+        return updated == 1
+    
+    def fail(self, job_id: str, lease_token: str, error: str) -> Optional[str]:
+        now = time.time()
+        with self._db.transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_token = ? AND status = ?",
+                (job_id, lease_token, JOB_LEASED)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = JOB_DEAD, now
+            else:
+                status, available_at = JOB_QUEUED, now + self.retry_backoff * 2 ** (row["attempts"] - 1)
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_token = NULL, updated_at = ? WHERE id = ?",
+                (status, error, available_at, now, job_id)
+            )
+        return status
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._db.connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+    
+    def dead_letters(self, limit: int = 100) -> List[Dict]:
+        rows = self._db.connection().execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (JOB_DEAD, limit)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+    
+    def requeue(self, job_id: str) -> bool:
+        now = time.time()
+        with self._db.transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (JOB_QUEUED, now, now, job_id, JOB_DEAD)
+            ).rowcount
+        return updated == 1
+    
+    def stats(self) -> Dict:
+        rows = self._db.connection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        stats = {JOB_QUEUED: 0, JOB_LEASED: 0, JOB_DONE: 0, JOB_DEAD: 0}
+        stats.update({row["status"]: row["n"] for row in rows})
+        return stats
+    
+    def close(self):
+        self._db.close()
+
+
+_BROKERS: Dict[str, Callable[[str], Broker]] = {
+    "sqlite": lambda location: SQLiteBroker(location)
+}
+
+
+def register_broker(scheme: str, factory: Callable[[str], Broker]):
+    _BROKERS[scheme] = factory
+
+
+def create_broker(url: str = None) -> Broker:
+    # "sqlite:///./data/work_queue.db" -> SQLiteBroker("./data/work_queue.db")
+    url = url or WORK_QUEUE_URL
+    scheme, sep, location = url.partition("://")
+    if not sep or scheme not in _BROKERS:
+        raise ValueError(f"Unsupported work queue URL: {url} (known schemes: {', '.join(sorted(_BROKERS))})")
+    if scheme == "sqlite" and location.startswith("/"):
+        location = location[1:]
+    return _BROKERS[scheme](location)
+
+
+class QueueWorker:
+    
+    def __init__(self, broker: Broker, pipeline, worker_id: str = None, lease_seconds: float = None,
+                 poll_interval: float = None):
+        self.broker = broker
+        self.pipeline = pipeline
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds or WORK_QUEUE_LEASE_SECONDS
+        self.poll_interval = poll_interval or WORK_QUEUE_POLL_INTERVAL
+        self._stop = threading.Event()
+        self.stats = {"completed": 0, "failed": 0, "dead_lettered": 0, "lost_leases": 0}
+    
+    def _execute(self, job: Dict):
+        payload = job["payload"]
+        if job["kind"] == "claim":
+            result = self.pipeline.verify_claim(payload["claim"], payload.get("evidence"))
+            failed = [result] if is_failed_verification(result) else []
+        elif job["kind"] == "text":
+            result = self.pipeline.verify_text(
+                payload["text"], payload.get("extract_claims", True), payload.get("method", "spacy")
+            )
+            failed = [r for r in result if is_failed_verification(r)]
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        
+        # verify_claim reports LLM outages as degraded results instead of raising; those are
+        # the failures worth retrying (verified claims of a text are reused from its cache)
+        if failed:
+            raise VerificationFailed(f"{len(failed)} claim(s) could not be verified: {failed[0].get('reasoning')}")
+        return result
+    
+    def _heartbeat(self, job: Dict, done: threading.Event):
+        # Renews the lease at a third of its length so a slow job is not handed to another worker
+        while not done.wait(self.lease_seconds / 3):
+            if not self.broker.heartbeat(job["id"], job["lease_token"], self.lease_seconds):
+                logger.warning("Lost the lease on job %s", job["id"])
+                return
+    
+    def _fail(self, job: Dict, error: Exception):
+        try:
+            status = self.broker.fail(job["id"], job["lease_token"], f"{type(error).__name__}: {error}")
+        except Exception as e:
+            # The lease runs out and the job becomes visible again, so the worker carries on
+            logger.error("Could not record the failure of job %s: %s", job["id"], e)
+            self.stats["failed"] += 1
+            return
+        logger.error("Job %s failed: %s (now %s)", job["id"], error, status or "owned by another worker")
+        self.stats["dead_lettered" if status == JOB_DEAD else "failed"] += 1
+    
+    def process_one(self) -> bool:
+        job = self.broker.lease(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done), name="work-queue-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            with request_context(job["id"]):
+                logger.info("Worker %s running job %s (%s, attempt %d/%d)",
+                            self.worker_id, job["id"], job["kind"], job["attempts"], job["max_attempts"])
+                try:
+                    result = self._execute(job)
+                    completed = self.broker.complete(job["id"], job["lease_token"], result)
+                except Exception as e:
+                    self._fail(job, e)
+                    return True
+                
+                if completed:
+                    self.stats["completed"] += 1
+                else:
+                    self.stats["lost_leases"] += 1
+                    logger.warning("Job %s finished after its lease moved to another worker; result dropped", job["id"])
+        finally:
+            done.set()
+            heartbeat.join()
+        return True
+    
+    def run(self, max_jobs: int = None, exit_when_idle: bool = False):
+        logger.info("Queue worker %s started", self.worker_id)
+        processed = 0
+        while not self._stop.is_set():
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            if self.process_one():
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                self._stop.wait(self.poll_interval)
+        logger.info("Queue worker %s stopped after %d jobs: %s", self.worker_id, processed, self.stats)
+        return self.stats
+    
+    def stop(self):
+        self._stop.set()
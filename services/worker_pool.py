@@ -0,0 +1,344 @@
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+from config import WORKER_POOL_SIZE, WORKER_TORCH_THREADS
+from utils.logger import logger, restart_logging_after_fork, shutdown_logging
+
+
+# Populated in the parent before fork so every worker inherits the same pages
+_shared_models: Dict = {}
+
+
+def _read_memory(pid: int) -> Dict:
+    usage = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[key.lower() + "_mb"] = int(value.split()[0]) / 1024
+    except OSError:
+        usage["error"] = "memory stats unavailable on this platform"
+    return usage
+
+
+def _worker_main(worker_id: int, conn, pipeline_factory: Callable):
+    restart_logging_after_fork()
+    # Frozen objects are never scanned, so the collector does not write to shared pages
+    gc.enable()
+    
+    try:
+        import torch
+        torch.set_num_threads(WORKER_TORCH_THREADS)
+    except ImportError:
+        pass
+    
+    try:
+        pipeline = pipeline_factory(_shared_models)
+    except Exception as e:
+        logger.error("Worker %d failed to build pipeline: %s", worker_id, e)
+        conn.send(("init_error", None, str(e)))
+        shutdown_logging()
+        return
+    
+    conn.send(("ready", None, os.getpid()))
+    logger.info("Worker %d ready (pid %d)", worker_id, os.getpid())
+    
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        
+        task_id, method, args, kwargs = task
+        try:
+            result = getattr(pipeline, method)(*args, **kwargs)
+            message = ("ok", task_id, result)
+        except Exception as e:
+            logger.error("Worker %d task %d failed: %s", worker_id, task_id, e)
+            message = ("error", task_id, f"{type(e).__name__}: {e}")
+        # A pipe write completes before the worker takes its next task, so a result is
+        # never lost in a buffer when the worker is killed afterwards
+        conn.send(message)
+    
+    logger.info("Worker %d shutting down", worker_id)
+    shutdown_logging()
+
+
+def load_shared_models() -> Dict:
+    from models.claim_extractor import ClaimExtractor
+    from models.embedder import Embedder
+    
+    return {
+        "claim_extractor": ClaimExtractor(),
+        "embedder": Embedder()
+    }
+
+
+def build_worker_pipeline(shared_models: Dict):
+    from services.pipeline import FactCheckPipeline
+    
+    # The Chroma client (SQLite) and the HTTP client are not fork-safe, so
+    # each worker opens its own; only the read-only model weights are shared
+    return FactCheckPipeline(
+        claim_extractor=shared_models.get("claim_extractor"),
+        embedder=shared_models.get("embedder")
+    )
+
+
+class WorkerPool:
+    # Each worker has its own pipe and the parent hands out tasks, so it always knows
+    # which task a worker holds. A worker that dies (OOM killer, segfault) fails that
+    # task's future and is replaced by a fresh fork.
+    
+    def __init__(
+        self,
+        num_workers: int = None,
+        model_loader: Optional[Callable[[], Dict]] = None,
+        pipeline_factory: Optional[Callable[[Dict], object]] = None
+    ):
+        self.num_workers = num_workers or WORKER_POOL_SIZE
+        self.model_loader = model_loader or load_shared_models
+        self.pipeline_factory = pipeline_factory or build_worker_pipeline
+        
+        self._ctx = mp.get_context("fork")
+        self._workers: List = []
+        self._conns: List = []
+        self._worker_pids: Dict[int, int] = {}
+        self._pending: Dict[int, Future] = {}
+        self._backlog = deque()
+        self._idle: List[int] = []
+        self._running: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._wakeup = None
+        self._collector = None
+        self._started = False
+        self._stopping = False
+        self.stats = {"worker_crashes": 0, "respawns": 0, "tasks_lost": 0}
+    
+    def start(self):
+        if self._started:
+            return
+        
+        logger.info("Loading shared models in parent process (pid %d)", os.getpid())
+        _shared_models.clear()
+        _shared_models.update(self.model_loader())
+        # Move the loaded models and everything else allocated so far into the permanent
+        # generation once, so neither parent nor children touch those object headers
+        # during GC. Respawns reuse it; freezing again would also pin request garbage.
+        gc.collect()
+        gc.freeze()
+        
+        self._stopping = False
+        for worker_id in range(self.num_workers):
+            process, conn = self._spawn(worker_id)
+            self._workers.append(process)
+            self._conns.append(conn)
+        
+        self._wait_until_ready()
+        
+        # Started after forking so no child inherits a half-running thread
+        self._wakeup = self._ctx.Pipe(duplex=False)
+        self._collector = threading.Thread(target=self._collect_results, name="worker-pool-collector", daemon=True)
+        self._collector.start()
+        self._started = True
+        
+        logger.info("Worker pool started with %d workers", self.num_workers)
+    
+    def _spawn(self, worker_id: int):
+        # No collection between here and the fork; the child re-enables GC itself.
+        # Respawns fork from the collector thread, the only thread the child keeps.
+        parent_conn, child_conn = self._ctx.Pipe()
+        gc.disable()
+        try:
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(worker_id, child_conn, self.pipeline_factory),
+                name=f"fact-checker-worker-{worker_id}",
+                daemon=True
+            )
+            process.start()
+        finally:
+            gc.enable()
+        child_conn.close()
+        return process, parent_conn
+    
+    def _wait_until_ready(self):
+        for worker_id, conn in enumerate(self._conns):
+            try:
+                status, _, payload = conn.recv()
+            except EOFError:
+                status, payload = "init_error", "worker exited during startup"
+            if status == "init_error":
+                self.shutdown()
+                raise RuntimeError(f"Worker {worker_id} failed to initialize: {payload}")
+            self._worker_pids[worker_id] = payload
+            self._idle.append(worker_id)
+    
+    def _dispatch(self):
+        # Caller holds self._lock
+        while self._backlog and self._idle:
+            worker_id = self._idle.pop()
+            task = self._backlog.popleft()
+            self._running[worker_id] = task[0]
+            self._conns[worker_id].send(task)
+    
+    def _collect_results(self):
+        wakeup_reader = self._wakeup[0]
+        while True:
+            conns = {self._conns[w]: w for w in range(len(self._workers)) if self._conns[w] is not None}
+            sentinels = {self._workers[w].sentinel: w for w in conns.values()}
+            for ready in wait(list(conns) + list(sentinels) + [wakeup_reader]):
+                if ready is wakeup_reader:
+                    if wakeup_reader.recv() is None:
+                        return
+                elif ready in conns:
+                    self._receive(conns[ready])
+                elif ready in sentinels and not self._stopping:
+                    self._replace_dead_worker(sentinels[ready])
+    
+    def _receive(self, worker_id: int) -> bool:
+        try:
+            status, task_id, payload = self._conns[worker_id].recv()
+        except (EOFError, OSError):
+            # The process sentinel reports the death
+            return False
+        
+        with self._lock:
+            if status == "ready":
+                self._worker_pids[worker_id] = payload
+                self._idle.append(worker_id)
+                self._dispatch()
+                return True
+            if status == "init_error":
+                logger.error("Respawned worker %d failed to initialize: %s", worker_id, payload)
+                self._conns[worker_id] = None
+                return False
+            
+            self._running.pop(worker_id, None)
+            future = self._pending.pop(task_id, None)
+            self._idle.append(worker_id)
+            self._dispatch()
+        
+        if future is not None:
+            if status == "ok":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+        return True
+    
+    def _replace_dead_worker(self, worker_id: int):
+        process = self._workers[worker_id]
+        conn = self._conns[worker_id]
+        process.join(timeout=1.0)
+        # Anything it sent before dying is still readable, up to the end of the pipe
+        while conn.poll() and self._receive(worker_id):
+            pass
+        if self._conns[worker_id] is None:
+            return
+        
+        with self._lock:
+            task_id = self._running.pop(worker_id, None)
+            future = self._pending.pop(task_id, None) if task_id is not None else None
+            if worker_id in self._idle:
+                self._idle.remove(worker_id)
+            self._worker_pids.pop(worker_id, None)
+        
+        logger.error("Worker %d (pid %s) died with exit code %s%s; respawning", worker_id, process.pid,
+                     process.exitcode, " while running a task" if future is not None else "")
+        self.stats["worker_crashes"] += 1
+        if future is not None:
+            self.stats["tasks_lost"] += 1
+            future.set_exception(RuntimeError(
+                f"Worker {worker_id} died (exit code {process.exitcode}) while running this task"
+            ))
+        
+        conn.close()
+        self._workers[worker_id], self._conns[worker_id] = self._spawn(worker_id)
+        self.stats["respawns"] += 1
+    
+    def submit(self, method: str, *args, **kwargs) -> Future:
+        if not self._started:
+            raise RuntimeError("Worker pool is not started")
+        
+        task_id = next(self._task_ids)
+        future = Future()
+        with self._lock:
+            self._pending[task_id] = future
+            self._backlog.append((task_id, method, args, kwargs))
+            self._dispatch()
+        return future
+    
+    def verify_claim(self, claim: str, evidence: Optional[str] = None, timeout: float = None) -> Dict:
+        return self.submit("verify_claim", claim, evidence).result(timeout=timeout)
+    
+    def verify_claims(self, claims: List[str], timeout: float = None) -> List[Dict]:
+        futures = [self.submit("verify_claim", claim) for claim in claims]
+        return [future.result(timeout=timeout) for future in futures]
+    
+    def verify_text(self, text: str, extract_claims: bool = True, method: str = "spacy", timeout: float = None) -> List[Dict]:
+        return self.submit("verify_text", text, extract_claims, method).result(timeout=timeout)
+    
+    def memory_report(self) -> List[Dict]:
+        report = [dict(_read_memory(os.getpid()), worker="parent")]
+        for worker_id, pid in sorted(self._worker_pids.items()):
+            report.append(dict(_read_memory(pid), worker=worker_id))
+        return report
+    
+    def shutdown(self, timeout: float = 10.0):
+        self._stopping = True
+        with self._lock:
+            for conn in self._conns:
+                if conn is None:
+                    continue
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+        
+        for process in self._workers:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                logger.warning("Worker %s did not exit in time, terminating", process.name)
+                process.terminate()
+        
+        if self._collector is not None:
+            self._wakeup[1].send(None)
+            self._collector.join(timeout=timeout)
+            self._collector = None
+        
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+            self._backlog.clear()
+            self._idle = []
+            self._running = {}
+        
+        for conn in self._conns:
+            if conn is not None:
+                conn.close()
+        self._workers = []
+        self._conns = []
+        self._worker_pids = {}
+        self._started = False
+        gc.unfreeze()
+        
+        logger.info("Worker pool shut down")
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
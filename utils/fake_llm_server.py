@@ -0,0 +1,274 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Union
+
+from utils.logger import logger
+
+
+def default_responder(body: Dict) -> Union[str, Dict]:
+    # A dict is sent back as the input of a tool_use block, a string as a text block
+    system = body.get("system") or []
+    contents = [system if isinstance(system, list) else [system]] + [
+        message["content"] if isinstance(message["content"], list) else [message["content"]]
+        for message in body.get("messages", [])
+    ]
+    prompt = " ".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for content in contents
+        for block in content
+    )
+    structured = bool(body.get("tools"))
+    
+    if "Rank the search results" in prompt:
+        return {"ranking": [1, 2, 3]} if structured else "1, 2, 3"
+    if "Extract all factual claims" in prompt:
+        sentences = [s.strip() for s in prompt.split("Text:", 1)[-1].split(".") if len(s.strip()) > 20]
+        return {"claims": sentences[:10]} if structured else "\n".join(sentences[:10]) or "No claims found"
+    verdict = {
+        "verdict": random.choice(["True", "False", "Unverifiable"]),
+        "confidence": round(random.uniform(0.5, 0.95), 2),
+        "reasoning": "Synthetic verdict from the local fake LLM server."
+    }
+    return verdict if structured else json.dumps(verdict)
+
+
+class FakeLLMServer:
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_median_ms: float = 300.0,
+        latency_p99_ms: float = 1500.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        responder: Optional[Callable[[Dict], Union[str, Dict]]] = None,
+        seed: Optional[int] = None,
+        stream_chunk_chars: int = 12,
+        stream_chunk_ms: float = 20.0,
+        cache_ttl_seconds: float = 300.0,
+        cache_min_tokens: int = 0
+    ):
+        self.latency_median_ms = latency_median_ms
+        self.latency_p99_ms = max(latency_p99_ms, latency_median_ms)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder or default_responder
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_ms = stream_chunk_ms
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_min_tokens = cache_min_tokens
+        self._prompt_cache: Dict[str, float] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0,
+                      "disconnected": 0, "cache_reads": 0, "cache_writes": 0}
+        
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def sample_latency(self) -> float:
+        # Log-normal with the requested median and 99th percentile (z = 2.326)
+        sigma = math.log(self.latency_p99_ms / self.latency_median_ms) / 2.326 if self.latency_median_ms > 0 else 0.0
+        with self._lock:
+            return self.latency_median_ms * math.exp(sigma * self._random.gauss(0.0, 1.0)) / 1000.0
+    
+    def _roll(self) -> str:
+        with self._lock:
+            value = self._random.random()
+        if value < self.rate_limit_rate:
+            return "rate_limited"
+        if value < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return "ok"
+    
+    def prompt_usage(self, body: Dict) -> Dict:
+        # Mimics provider prompt caching: tools plus system blocks up to the last cache_control
+        # marker form the prefix, written on first use and read back while it is fresh
+        system = body.get("system") or []
+        if isinstance(system, str):
+            system = [{"type": "text", "text": system}]
+        marked = [i for i, block in enumerate(system) if isinstance(block, dict) and block.get("cache_control")]
+        if marked:
+            prefix = json.dumps([body.get("tools", []), system[:marked[-1] + 1]])
+            rest = json.dumps([system[marked[-1] + 1:], body.get("messages", [])])
+        else:
+            prefix = ""
+            rest = json.dumps([body.get("tools", []), system, body.get("messages", [])])
+        
+        usage = {"input_tokens": len(rest) // 4, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        prefix_tokens = len(prefix) // 4
+        if not marked or prefix_tokens < self.cache_min_tokens:
+            usage["input_tokens"] += prefix_tokens
+            return usage
+        
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._prompt_cache.get(key, 0.0) > now
+            self._prompt_cache[key] = now + self.cache_ttl_seconds
+            self.stats["cache_reads" if hit else "cache_writes"] += 1
+        usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = prefix_tokens
+        return usage
+    
+    def _count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.stats[key] += delta
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send_json(self, status: int, payload: Dict, headers: Dict = None):
+                # A client that gave up (deadline, hedge loser) has already closed the socket
+                data = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    for key, value in (headers or {}).items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count("disconnected")
+            
+            def _send_event(self, event: str, payload: Dict):
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            
+            def _send_stream(self, message: Dict, text: str):
+                # Server-sent events in the same order as the Messages streaming API;
+                # the sampled latency is then the time to the first token
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                
+                block = dict(message["content"][0])
+                if block["type"] == "tool_use":
+                    block["input"] = {}
+                    delta_type, delta_key = "input_json_delta", "partial_json"
+                else:
+                    block["text"] = ""
+                    delta_type, delta_key = "text_delta", "text"
+                
+                self._send_event("message_start", {
+                    "type": "message_start",
+                    "message": dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=0))
+                })
+                self._send_event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": block})
+                step = max(1, server.stream_chunk_chars)
+                for i in range(0, len(text), step):
+                    self._send_event("content_block_delta", {
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {"type": delta_type, delta_key: text[i:i + step]}
+                    })
+                    time.sleep(server.stream_chunk_ms / 1000.0)
+                self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._send_event("message_delta", {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                    "usage": {"output_tokens": message["usage"]["output_tokens"]}
+                })
+                self._send_event("message_stop", {"type": "message_stop"})
+            
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                
+                server._count("requests")
+                server._count("in_flight")
+                try:
+                    time.sleep(server.sample_latency())
+                    outcome = server._roll()
+                    
+                    if outcome == "rate_limited":
+                        server._count("rate_limited")
+                        self._send_json(429, {
+                            "type": "error",
+                            "error": {"type": "rate_limit_error", "message": "Injected rate limit"}
+                        }, headers={"retry-after": "1"})
+                        return
+                    if outcome == "error":
+                        server._count("errors")
+                        self._send_json(529, {
+                            "type": "error",
+                            "error": {"type": "overloaded_error", "message": "Injected overload"}
+                        })
+                        return
+                    
+                    output = server.responder(body)
+                    if isinstance(output, dict):
+                        tool_name = (body.get("tool_choice") or {}).get("name") or body["tools"][0]["name"]
+                        content = [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                                    "name": tool_name, "input": output}]
+                        stop_reason = "tool_use"
+                        text = json.dumps(output)
+                    else:
+                        content = [{"type": "text", "text": output}]
+                        stop_reason = "end_turn"
+                        text = output
+                    
+                    server._count("ok")
+                    message = {
+                        "id": f"msg_{uuid.uuid4().hex[:24]}",
+                        "type": "message",
+                        "role": "assistant",
+                        "model": body.get("model", "fake"),
+                        "content": content,
+                        "stop_reason": stop_reason,
+                        "stop_sequence": None,
+                        "usage": dict(server.prompt_usage(body), output_tokens=len(text) // 4)
+                    }
+                    if body.get("stream"):
+                        try:
+                            self._send_stream(message, text)
+                        except (BrokenPipeError, ConnectionResetError):
+                            server._count("disconnected")
+                    else:
+                        self._send_json(200, message)
+                finally:
+                    server._count("in_flight", -1)
+        
+        return Handler
+    
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        logger.info("Fake LLM server listening on %s", self.base_url)
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -1,8 +1,114 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
-import os
-from datetime import datetime
+import queue
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from config import LOG_LEVEL, LOG_FILE
+from typing import Dict, Optional
+
+from config import LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+_listeners = []
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    # Nested calls (e.g. verify_text -> verify_claim) keep the outer ID
+    if request_id is None and request_id_var.get() is not None:
+        yield request_id_var.get()
+        return
+    
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    
+    def __init__(self, rates: Dict[str, float] = None):
+        super().__init__()
+        self.rates = rates or {}
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+            "file": record.filename,
+            "line": record.lineno,
+        }
+        
+        event = getattr(record, "event", None)
+        if event is not None:
+            payload["event"] = event
+        
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() folds the traceback into the message and drops exc_info, which
+        # leaves JsonFormatter without its exception field. Records never leave the process,
+        # so only the message is rendered now (its args may change later).
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
 
 
 def setup_logger(name: str = "fact_checker", log_file: str = None, level: str = None):
@@ -20,10 +126,13 @@ def setup_logger(name: str = "fact_checker", log_file: str = None, level: str =
     if logger.handlers:
         return logger
     
-    detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if LOG_FORMAT == "json":
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] - [%(filename)s:%(lineno)d] - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
     
     console_formatter = logging.Formatter(
         '%(levelname)s - %(message)s'
@@ -31,17 +140,45 @@ def setup_logger(name: str = "fact_checker", log_file: str = None, level: str =
     
     file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(detailed_formatter)
+    file_handler.setFormatter(file_formatter)
     
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
     
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Disk and console writes happen on the listener thread, off the request path
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+    
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append((queue_handler, listener))
+    
+    logger.addHandler(queue_handler)
+    logger.propagate = False
     
     return logger
 
 
-logger = setup_logger()
+def restart_logging_after_fork():
+    # The listener thread does not survive fork; give the child its own queue and thread.
+    # Called by the processes this package forks itself (worker pool), as the first thing
+    # they do, so other libraries' forks are left alone.
+    for i, (queue_handler, listener) in enumerate(_listeners):
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        queue_handler.queue = log_queue
+        child_listener = QueueListener(log_queue, *listener.handlers, respect_handler_level=True)
+        child_listener.start()
+        _listeners[i] = (queue_handler, child_listener)
 
+
+@atexit.register
+def shutdown_logging():
+    while _listeners:
+        _, listener = _listeners.pop()
+        listener.stop()
+
+
+logger = setup_logger()
@@ -1,49 +1,93 @@
+# Prompts are split into a static system prefix, which LLMClient marks for prompt
+# caching, and a short per-call suffix with the claim, evidence or text.
+
 # Claim Extraction Prompt
-CLAIM_EXTRACTION_PROMPT = """
-Extract all factual claims from the following text. 
+CLAIM_EXTRACTION_SYSTEM_PROMPT = """
+Extract all factual claims from the text you are given. 
 A claim is a statement that can be verified as true or false.
 
-Text: {text}
+Return the claims with the record_claims tool. Be precise and specific.
+"""
 
-Return only the claims, one per line. Be precise and specific.
+CLAIM_EXTRACTION_PROMPT = """
+Text: {text}
 """
 
 # Verification Prompt
-VERIFICATION_PROMPT = """
-You are a fact-checker. Verify the following claim against the provided evidence.
-
-Claim: {claim}
-
-Evidence:
-{evidence}
+VERIFICATION_SYSTEM_PROMPT = """
+You are a fact-checker. Verify the claim you are given against the provided evidence.
 
 Based on the evidence provided, determine:
 1. Verdict: One of "True", "False", or "Unverifiable"
    - "True" if evidence supports the claim
    - "False" if evidence contradicts the claim
    - "Unverifiable" if evidence is insufficient or unclear
-2. Reasoning: Brief explanation (2-3 sentences) explaining your verdict
+2. Confidence: A number from 0.0 to 1.0 for how strongly the evidence supports your verdict
+3. Reasoning: Brief explanation (2-3 sentences) explaining your verdict
 
-Format your response as JSON:
-{{
-    "verdict": "True" | "False" | "Unverifiable",
-    "reasoning": "Your explanation here"
-}}
+Record your answer with the record_verdict tool.
+"""
+
+VERIFICATION_PROMPT = """
+Claim: {claim}
+
+Evidence:
+{evidence}
 """
 
 # Re-ranking Prompt
-RERANKING_PROMPT = """
-Rank the following search results by relevance to the claim.
+RERANKING_SYSTEM_PROMPT = """
+Rank the search results you are given by relevance to the claim.
+Rank them from most relevant (1) to least relevant.
+Record the result numbers in order of relevance with the record_ranking tool.
+"""
 
+RERANKING_PROMPT = """
 Claim: {claim}
 
-Search Results:
+Search Results ({count}):
 {results}
-
-Rank them from most relevant (1) to least relevant ({count}).
-Return only the indices in order of relevance, comma-separated.
 """
 
+# Structured Output Tools
+VERIFICATION_TOOL = {
+    "name": "record_verdict",
+    "description": "Record the verdict for the claim.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "verdict": {"type": "string", "enum": ["True", "False", "Unverifiable"]},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+            "reasoning": {"type": "string", "description": "2-3 sentences"}
+        },
+        "required": ["verdict", "confidence", "reasoning"]
+    }
+}
+
+RERANK_TOOL = {
+    "name": "record_ranking",
+    "description": "Record search result numbers from most to least relevant.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "ranking": {"type": "array", "items": {"type": "integer", "minimum": 1}}
+        },
+        "required": ["ranking"]
+    }
+}
+
+CLAIM_EXTRACTION_TOOL = {
+    "name": "record_claims",
+    "description": "Record the factual claims found in the text.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "claims": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["claims"]
+    }
+}
+
 # Fact Generation Prompt (for data ingestion)
 FACT_GENERATION_PROMPT = """
 Extract structured factual information from the following text.
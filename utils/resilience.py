@@ -0,0 +1,140 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+
+_deadline_var: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    # A nested scope can only shorten the deadline set by its caller
+    if seconds is None:
+        yield _deadline_var.get()
+        return
+    
+    deadline = time.monotonic() + seconds
+    outer = _deadline_var.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    
+    token = _deadline_var.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline_var.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    deadline = _deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class LatencyTracker:
+    
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            return float(np.percentile(list(self._samples), q))
+
+
+class CircuitBreaker:
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, window: int, min_calls: int, error_rate: float, latency_threshold: float,
+                 latency_percentile: float, cooldown: float):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_threshold = latency_threshold
+        self.latency_percentile = latency_percentile
+        self.cooldown = cooldown
+        
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.stats = {"opened": 0, "rejected": 0}
+    
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            
+            # Half-open lets exactly one trial call through
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            
+            self.stats["rejected"] += 1
+            return False
+    
+    def release(self):
+        # Gives back a trial call that ended without an outcome worth recording
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+    
+    def record(self, success: bool, latency: float):
+        with self._lock:
+            # Late results from calls started before the breaker opened are ignored
+            if self.state == self.OPEN:
+                return
+            if self.state == self.HALF_OPEN:
+                if success and latency < self.latency_threshold:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            
+            self._outcomes.append((success, latency))
+            if len(self._outcomes) < self.min_calls:
+                return
+            
+            failures = sum(1 for ok, _ in self._outcomes if not ok)
+            slow = np.percentile([lat for _, lat in self._outcomes], self.latency_percentile)
+            if failures / len(self._outcomes) >= self.error_rate or slow >= self.latency_threshold:
+                self._open()
+    
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+        self.stats["opened"] += 1
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, state=self.state)
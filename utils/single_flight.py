@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "errors": 0}
+    
+    def join(self, key: Hashable):
+        # Returns (future, leader); the leader must settle the future with resolve()
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future, False
+            
+            future = Future()
+            self._in_flight[key] = future
+            self.stats["executed"] += 1
+            return future, True
+    
+    def resolve(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        try:
+            if error is not None:
+                with self._lock:
+                    self.stats["errors"] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        finally:
+            # Drop the entry so a failure is only shared with callers that were already waiting
+            with self._lock:
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+    
+    def _finish(self, key: Hashable, future: Future, fn: Callable[[], Any]):
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, future, error=e)
+        else:
+            self.resolve(key, future, result)
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        future, leader = self.join(key)
+        if leader:
+            self._finish(key, future, fn)
+        return copy.deepcopy(future.result())
+    
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        future, leader = self.join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, contextvars.copy_context().run, self._finish, key, future, fn)
+        return copy.deepcopy(await asyncio.wrap_future(future))
+    
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+    
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._in_flight))
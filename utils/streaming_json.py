@@ -0,0 +1,162 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def _join(chars: List[str]) -> str:
+    # Re-pairs UTF-16 surrogates written as two \uXXXX escapes
+    return "".join(chars).encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+
+class IncrementalJSONParser:
+    # Parses one JSON object as it streams in. Top-level fields are reported the moment
+    # their value is complete, and string values are also reported piece by piece.
+    
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._chars: List[str] = []
+        self._escape: Optional[str] = None
+        self._emitted = 0
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+    
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        # Returns ("delta", key, text) for string pieces and ("field", key, value) for finished fields
+        events = []
+        for ch in chunk:
+            self._step(ch, events)
+        if self._state == "string":
+            ready = len(self._chars)
+            # A high surrogate waits for its pair from the next chunk
+            if ready and 0xD800 <= ord(self._chars[-1]) <= 0xDBFF:
+                ready -= 1
+            if ready > self._emitted:
+                events.append(("delta", self._key, _join(self._chars[self._emitted:ready])))
+                self._emitted = ready
+        return events
+    
+    def _string_char(self, ch: str) -> bool:
+        if self._escape is not None:
+            if self._escape == "":
+                if ch == "u":
+                    self._escape = "u"
+                else:
+                    self._chars.append(ESCAPES.get(ch, ch))
+                    self._escape = None
+                return False
+            self._escape += ch
+            if len(self._escape) == 5:
+                self._chars.append(chr(int(self._escape[1:], 16)))
+                self._escape = None
+            return False
+        if ch == "\\":
+            self._escape = ""
+            return False
+        if ch == '"':
+            return True
+        self._chars.append(ch)
+        return False
+    
+    def _finish_value(self, value: Any, events: List):
+        self.fields[self._key] = value
+        events.append(("field", self._key, value))
+        self._chars = []
+        self._state = "after_value"
+    
+    def _step(self, ch: str, events: List):
+        state = self._state
+        
+        if state == "start":
+            if ch == "{":
+                self._state = "key_start"
+            elif not ch.isspace():
+                raise ValueError(f"Expected '{{' but got {ch!r}")
+        
+        elif state == "key_start":
+            if ch == '"':
+                self._chars = []
+                self._state = "key"
+            elif ch == "}":
+                self._state = "end"
+                self.done = True
+            elif not ch.isspace():
+                raise ValueError(f"Expected a key but got {ch!r}")
+        
+        elif state == "key":
+            if self._string_char(ch):
+                self._key = _join(self._chars)
+                self._chars = []
+                self._state = "colon"
+        
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value_start"
+            elif not ch.isspace():
+                raise ValueError(f"Expected ':' but got {ch!r}")
+        
+        elif state == "value_start":
+            if ch.isspace():
+                return
+            self._chars = []
+            if ch == '"':
+                self._emitted = 0
+                self._state = "string"
+            elif ch in "{[":
+                self._chars.append(ch)
+                self._depth = 1
+                self._nested_in_string = False
+                self._nested_escape = False
+                self._state = "nested"
+            else:
+                self._chars.append(ch)
+                self._state = "scalar"
+        
+        elif state == "string":
+            if self._string_char(ch):
+                if len(self._chars) > self._emitted:
+                    events.append(("delta", self._key, _join(self._chars[self._emitted:])))
+                self._finish_value(_join(self._chars), events)
+        
+        elif state == "scalar":
+            if ch in ",}" or ch.isspace():
+                self._finish_value(json.loads("".join(self._chars)), events)
+                self._step(ch, events)
+            else:
+                self._chars.append(ch)
+        
+        elif state == "nested":
+            # Nested objects and arrays are buffered and decoded once they close
+            self._chars.append(ch)
+            if self._nested_in_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif ch == "\\":
+                    self._nested_escape = True
+                elif ch == '"':
+                    self._nested_in_string = False
+            elif ch == '"':
+                self._nested_in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(json.loads("".join(self._chars)), events)
+        
+        elif state == "after_value":
+            if ch == ",":
+                self._state = "key_start"
+            elif ch == "}":
+                self._state = "end"
+                self.done = True
+            elif not ch.isspace():
+                raise ValueError(f"Expected ',' or '}}' but got {ch!r}")
+        
+        elif not ch.isspace():
+            raise ValueError(f"Unexpected {ch!r} after the end of the object")